@@ -0,0 +1,52 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Board view code:                                                                                                       #
+# This code keeps the grid of GUI buttons in step with the game board. It remembers what each button is currently        #
+# showing and, whenever the board changes (player move, AI move or reset), it only reconfigures the buttons whose        #
+# tile actually changed. The font is made once when the view is created and shared by every button, so a move only       #
+# costs one button update no matter how big the board is.                                                                #
+#                                                                                                                        #
+##########################################################################################################################
+
+import tkinter.font as tkfont
+
+class BoardView:
+    def __init__(self, root, rows, columns, font_size):
+        #one shared font for every tile (instead of making a new font tuple on every update)
+        self.font = tkfont.Font(root=root, family="Helvetica", size=font_size)
+
+        #grid of buttons, filled in by the GUI with add_tile
+        self.buttons = [[None] * columns for _ in range(rows)]
+
+        #text each tile is currently showing
+        self.shown = {}
+
+        #number of moves on the board currently showing
+        self.shown_ply = None
+
+    def add_tile(self, row, col, button):
+        #registers a grid tile (button) with the view
+        button.configure(text='', font=self.font)
+        self.buttons[row][col] = button
+        self.shown[row, col] = ''
+
+    def update(self, board):
+        #if the board is one move on from the one showing (a player or AI move), only the tile just played can have changed
+        if self.shown_ply is not None and board.ply == self.shown_ply + 1:
+            cells = [board.last_move]
+
+        #otherwise (e.g. a reset) goes through the whole board
+        else:
+            cells = board.position
+
+        self.shown_ply = board.ply
+
+        #only updates the tiles that have changed since the last update
+        for row, col in cells:
+            player = board.position[row, col]
+            text = player if player != board.empty_space else ''
+
+            if self.shown[row, col] != text:
+                self.buttons[row][col].configure(text=text)
+                self.shown[row, col] = text
@@ -14,156 +14,13 @@
 ##########################################################################################################################
 
 from mcts import MCTS
-from copy import deepcopy
+from mnkboard import MNKBoard
+from openingbook import open_book, book_path
 
-class Board():
+class Board(MNKBoard):
     def __init__(self, board=None):
-        self.player_1 = 'x'
-        self.player_2 = 'o' 
-        self.empty_space = '.'
-
-        #the number of rows and columns
-        self.columns = 7  
-        self.rows = 6   
-
-         #defines board position
-        self.position = {}
-
-        #reset board
-        self.init_board()
-        
-        # create a copy of a previous board state if available
-        if board is not None:
-            self.__dict__ = deepcopy(board.__dict__)
-
-    #resets board by changing every space to an empty space again
-    def init_board(self):
-        for row in range(self.rows):
-            for col in range(self.columns):
-                self.position[row, col] = self.empty_space
-
-    def make_move(self, col):
-        # create new board instance that inherits from the current state
-        board = Board(self)
-        
-        #determines whos turn it is
-        player = board.player_1 if board.player_1 else board.player_2
-
-        #iterates through the rows from bottom to top
-        for row in range(self.rows - 1, -1, -1):
-
-            #checks if the space is empty
-            if board.position[row, col] == self.empty_space:
-
-                #places player's move in that space
-                board.position[row, col] = player
-                break  
-
-        # swap players
-        (board.player_1, board.player_2) = (board.player_2, board.player_1)
-
-        # return new board state
-        return board
-
-    
-    def __str__(self):
-        # define board string representation
-        string_of_board = ''
-        
-        # loop over board rows
-        for row in range(6):
-            # loop over board columns
-            for col in range(7):
-                string_of_board += ' %s' % self.position[row, col]
-            
-            # print new line every row
-            string_of_board += '\n'
-        
-        # prepend side to move
-        if self.player_1 == 'x':
-            string_of_board = '\n------------\n "x" turn:\n-------------\n\n' + string_of_board
-        
-        elif self.player_1 == 'o':
-            string_of_board = '\n------------\n "o" turn:\n-------------\n\n' + string_of_board
-                        
-        # return board string
-        return string_of_board
-
-    def is_draw(self):
-        # loop over board squares
-        for row, col in self.position:
-            #if there is an empty space available
-            if self.position[row, col] == self.empty_space:
-                #it's not a draw
-                return False
-            
-            # by default we return a draw
-        return True
-
-    def is_win(self):
-        #checks win conditions
-        for row in range(self.rows):
-            for col in range(self.columns):
-
-                #if the current position is empty, skip it
-                if self.position[row, col] == self.empty_space:
-                    continue
-
-                ##################################
-                # Vertical sequence detection
-                ##################################
-                
-                #checks if there are enough rows below the current row to form a vertical win sequence
-                if row <= self.rows - 4:
-
-                    #checks if all positions in that column have the same value for the next 4 rows
-                    if all(self.position[row+i, col] == self.position[row, col] for i in range(4)):
-
-                        # if they match, returns True because a vertical win was found
-                        return True
-
-                ##################################
-                # Horizontal sequence detection
-                ##################################
-                    
-                #checks if there are enough columns to the right to form a horizontal win sequence
-                if col <= self.columns - 4:
-
-                    #checks if all positions in that row have the same value for the next 4 columns
-                    if all(self.position[row, col+i] == self.position[row, col] for i in range(4)):
-
-                        # if they match, returns True because a horizontal win was found
-                        return True
-
-                ##################################
-                # 1st diagonal sequence detection (top-left to bottom-right)
-                ################################## 
-                        
-                #checks if there are enough rows and columns to form a diagonal win sequence towards bottom right
-                if row <= self.rows - 4 and col <= self.columns - 4:
-
-                    #checks if all positions in the diagonal have the same value for the next 4 diagonal positions
-                    if all(self.position[row+i, col+i] == self.position[row, col] for i in range(4)):
-
-                        # if they match, returns True because a diagonal win sequence from top-left to bottom-right was found
-                        return True
-
-                ##################################
-                # 2nd diagonal sequence detection (top-right to bottom-left)
-                ################################## 
-                        
-                #checks if there are enough rows and columns to form a diagonal sequence towards bottom left
-                if row <= self.rows - 4 and col >= 3:
-
-                    #checks if all positions in the diagonal have the same value for the next 4 diagonal positions
-                    if all(self.position[row + i, col - i] == self.position[row, col] for i in range(4)):
-
-                        # if they match, returns True because a diagonal win sequence from top-right to bottom-left was found
-                        return True
-
-        #if no win was found, returns False
-        return False
-
+        #Connect4 is a 6 x 7 board where pieces drop down the columns and 4 in a row wins
+        super().__init__(board, rows=6, columns=7, k=4, gravity=True)
 
     def game_loop(self):
         print(' Type "exit" to quit')
@@ -172,8 +29,8 @@ class Board():
         # prints board
         print(self)
         
-        # creates MCTS instance
-        mcts = MCTS()
+        # creates MCTS instance (using the opening book if one has been built)
+        mcts = MCTS(book=open_book(book_path('connect4')))
                 
         # game loop
         while True:
@@ -236,15 +93,6 @@ class Board():
                 print('  Illegal move!')
                 print('  Move format col: 1 where 1 is the column number (1 to 7)')
 
-    def generate_states(self):
-        actions = []
-        for col in range(self.columns):
-            if self.position[0, col] == self.empty_space:
-
-                actions.append(self.make_move(col))
-
-        return actions
-
 
 if __name__ == '__main__':
     # creates board instance
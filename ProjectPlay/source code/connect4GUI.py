@@ -20,15 +20,24 @@
 # newTicImageGUI. I then made any nessessary changes to made the code into what was required.                            #
 # The same image processing code [6] that was used in newTicImageGUI was used to create the image processing part of     #
 # this program.                                                                                                          #
+# The image processing itself is in vision.py (shared with the TicTacToe GUI and the vision service).                    #
 #                                                                                                                        #
 ##########################################################################################################################
 
-import numpy as np
 import cv2
 import tkinter as tk
 from tkinter import messagebox
 from connect4 import Board, MCTS
 import time
+from webcamview import WebcamView
+from boardview import BoardView
+from openingbook import open_book, book_path
+from treestore import tree_path
+from valuenet import open_value_net, value_path
+from vision import BoardDetector, save_calibration
+
+#finds the player's move in the webcam image (keeps its images between frames)
+detector = BoardDetector(6, 7, columns_only=True)
 
 class Connect4GUI:
     def __init__(self, root):
@@ -44,31 +53,32 @@ class Connect4GUI:
         self.frame = tk.Frame(self.root, bg='red')
         self.frame.pack(padx=20,pady=20)
 
-        self.buttons = [[None] * 7 for _ in range(6)]
+        #the board view keeps the buttons in step with the board (only redrawing tiles that change)
+        self.view = BoardView(self.root, 6, 7, 20)
 
         for row in range(6):
             for col in range(7):
                 #makes grid tiles (as buttons)
-                grid_tile = tk.Button(self.frame, text='', font=("Helvetica", 20), width=4, height=2, padx=10, pady=10, command=lambda c=col: self.on_button_click(c))
+                grid_tile = tk.Button(self.frame, width=4, height=2, padx=10, pady=10, command=lambda c=col: self.on_button_click(c))
                 grid_tile.grid(row=row, column=col, padx=8, pady=8)
                 
-                self.buttons[row][col] = grid_tile
+                self.view.add_tile(row, col, grid_tile)
 
         #adds instructions to the bottom of the screen 
-        self.instructions = tk.Label(self.root, text="Press 's' to confirm player move, 'r' to reset the board, and 'q' to quit", font=("Helvetica", 12), bg='black', fg='white')
+        self.instructions = tk.Label(self.root, text="Press 's' to confirm player move, 'c' to calibrate the colours, 'r' to reset the board, and 'q' to quit", font=("Helvetica", 12), bg='black', fg='white')
         self.instructions.place(relx = 0.5, rely = 0.95, anchor = "center")
 
         #keeps the game board in the center of the screen
         self.frame.place(relx=0.5, rely=0.5, anchor="center")
 
-        #initializes the TicTacToe board and the MCTS algorithm
+        #initializes the Connect4 board and the MCTS algorithm (using the opening book if one has been built, the
+        #value network if one has been trained, and carrying on from the search tree saved by the last game)
         self.board = Board()  
-        self.mcts = MCTS()  
+        self.mcts = MCTS(book=open_book(book_path('connect4')), tree_path=tree_path('connect4'), evaluator=open_value_net(value_path('connect4')))
 
     def on_button_click(self, col):
-        if not self.board.is_win() and not self.board.is_draw():
-            self.board = self.board.make_move(col)
-            self.update_board_gui()
+        if self.board.position[0, col] == self.board.empty_space and not self.board.is_win() and not self.board.is_draw():
+            self.set_board(self.board.make_move(col))
 
             #if the board is not in a terminal state after player move, wait 1 second and then let the MCTS algorithm move its move
             if not self.board.is_win() and not self.board.is_draw():
@@ -82,8 +92,7 @@ class Connect4GUI:
 
     def move_AI(self):
         best_move = self.mcts.search(self.board)
-        self.board = best_move.board
-        self.update_boardGUI()
+        self.set_board(best_move.board)
 
         if self.board.is_win():
             winner = 'o' if self.board.player_1 == 'x' else 'x'
@@ -91,78 +100,22 @@ class Connect4GUI:
         elif self.board.is_draw():
             messagebox.showinfo("Game Over", "It's a draw!")
 
-    def update_boardGUI(self):
-        #updates GUI with new board state
-        for row in range(6):
-            for col in range(7):
-                player = self.board.position[row, col]
-                text = player if player != self.board.empty_space else ''
-                self.buttons[row][col].configure(text=text, font=("Helvetica", 20))
+    def set_board(self, board):
+        #every board change (player move, AI move or reset) goes through here so the GUI always matches the board
+        self.board = board
+        self.view.update(board)
 
 
 def image_processing(image, gui):
-    #This converts the RGB image to a HSV image. This is because HSV is better for object detection
-    image_in_HSV = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-
-    # [REF][6]
-    #defines the upper and lower bounds for the red colour we want to detect
-    #lower bounds of the red color range values (0 - 10)
-    red_lowerbound1 = np.array([0, 100, 20])
-    red_upperbound1 = np.array([10, 255, 255])
-
-    #upper bounds of the red color range values (160 - 180)
-    red_lowerbound2 = np.array([160,100,20])
-    red_upperbound2 = np.array([179,255,255])
-
-    #makes masks for both upper and lower boundaries
-    redmask1 = cv2.inRange(image_in_HSV, red_lowerbound1, red_upperbound1)
-    redmask2 = cv2.inRange(image_in_HSV, red_lowerbound2, red_upperbound2)
-
-    #combines red masks to make final red mask
-    final_redmask = redmask1 + redmask2
-
-    #defines the upper and lower bounds for the green colour we want to detect
-    green_lowerbound = np.array([40, 40, 40])
-    green_upperbound = np.array([80, 255, 255])
-
-    #isolates all green from the image by making a green mask
-    greenmask = cv2.inRange(image_in_HSV, green_lowerbound, green_upperbound)
-
-    #combines the red and green masks
-    final_combinedmask = cv2.bitwise_or(final_redmask, greenmask)
-
-    #overlay the combined mask with the original image so we can see the colours (for troubleshooting)
-    final_filteredImage = cv2.bitwise_or(image.copy(), image.copy(), mask=final_combinedmask)
-
-    #defines the columns in the grid
-    cols = 7
-    
-    gridWidth = image.shape[1] // cols
-
-    currentMaxGreen = 0
-    currentMaxGreen_col = None
-
-    #goes through grid to find the region with the most green
-    for c in range(cols):
-        #defines the current grid region
-        x1 = c * gridWidth
-        x2 = (c+1) * gridWidth
-
-        #finds the current green concentration in the region
-        green_concentration = np.count_nonzero(greenmask[:, x1:x2])
-
-        #updates the new cell with the max concentration of green
-        if green_concentration > currentMaxGreen:
-            currentMaxGreen = green_concentration
-            currentMaxGreen_col = c
+    #finds the column with the most green in it (see vision.py, the marker can be in any row of the column)
+    move = detector.detect(image)
 
     #updates the GUI of the corresponding cell that the most green was in
-    if currentMaxGreen_col is not None:
-        gui.on_button_click(currentMaxGreen_col)
+    if move is not None:
+        gui.on_button_click(move[1])
 
-    #shows the final filtered image for troubleshooting
-    cv2.imshow("Final filtered image", final_filteredImage)
-    cv2.waitKey(1)
+    #returns the final filtered image for troubleshooting
+    return detector.filtered
 
 def play_Connect4():
     root = tk.Tk()
@@ -170,46 +123,47 @@ def play_Connect4():
     connect4_gui = Connect4GUI(root)
 
     #makes it fullscreen
-    root.attributes('-fullscreen', True)  
+    root.attributes('-fullscreen', True)
 
-    #opens up webcam window so we can make sure the grid is fully in frame
+    #opens up the webcam and shows it in the corner of the window so we can make sure the grid is fully in frame
     cap = cv2.VideoCapture(0)
-    webcam_window = cv2.namedWindow('Webcam', cv2.WINDOW_NORMAL)  # Create the webcam window
-
-    quit = False  
+    webcam = WebcamView(root, cap)
+    webcam.place(relx=0.98, rely=0.02, anchor="ne")
 
     def on_key_press(event):
-        nonlocal quit
         key = event.keysym
         if key == 'q':
-            quit = True
+            #saves the search tree for next time and stops the event loop
+            connect4_gui.mcts.save_tree()
+            webcam.stop()
+            root.quit()
         elif key == 's':
-            ret, frame = cap.read()
-            image_processing(frame, connect4_gui)
+            frame = webcam.read()
+            if frame is not None:
+                #shows the filtered image in the webcam view for troubleshooting
+                webcam.show_still(image_processing(frame, connect4_gui))
+        elif key == 'c':
+            frame = webcam.read()
+            if frame is not None:
+                #recalibrates the colours from the board as it looks now (with the marker on it) and shows what is
+                #picked up with the new colours
+                save_calibration([frame])
+                detector.detect(frame)
+                webcam.show_still(detector.filtered)
         elif key == 'r':
-            #resets the game board
-            connect4_gui.board = Board()  
-
-            #updates GUI to clear board
-            connect4_gui.update_boardGUI() 
+            #saves the search tree for the next game and resets the game board (and clears the GUI)
+            connect4_gui.mcts.save_tree()
+            connect4_gui.set_board(Board())
 
     root.bind('<KeyPress>', on_key_press)
 
-    while not quit:
-        ret, frame = cap.read()
-        cv2.imshow("Webcam", frame)
-
-        # Set focus to the webcam window explicitly
-        cv2.setWindowProperty("Webcam", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-
-        #updates everything so the player can see
-        root.update_idletasks()
-        root.update()
+    #webcam frames are scheduled with root.after, so Tk sleeps between frames instead of spinning
+    webcam.start()
+    root.mainloop()
 
     #closes everything down (only accessed if the player presses the 'q' key)
     cap.release()
-    cv2.destroyAllWindows()
-    root.quit()
+    root.destroy()
 
 if __name__ == "__main__":
     play_Connect4()
\ No newline at end of file
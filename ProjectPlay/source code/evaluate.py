@@ -0,0 +1,125 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Evaluation code:                                                                                                       #
+# This code plays two MCTS agents against each other and counts the results. Each agent is a set of MCTS settings,       #
+# e.g. "iterations=500,rave=True". The agents swap sides every game so neither gets to go first more often. The          #
+# results are written one line per game like the files in "Evaluation (Game Results)" and a summary is printed.          #
+# Giving an agent a seed (e.g. "seed=1") makes the whole run repeatable. With --records every game is also added to a    #
+# game records file (see gamerecords.py) with its moves, think times and playouts.                                       #
+#                                                                                                                        #
+# Example:  python evaluate.py connect4 --games 50 --a iterations=500,rave=True --b iterations=500                       #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import ast
+import time
+from mcts import MCTS
+from gamerecords import GameRecord, append_record
+
+#turns "iterations=500,rave=True" into the MCTS settings {'iterations': 500, 'rave': True}
+def parse_agent(settings):
+    config = {}
+
+    for setting in filter(None, settings.split(',')):
+        name, value = setting.split('=')
+        config[name.strip()] = ast.literal_eval(value.strip())
+
+    return config
+
+#makes an MCTS agent from its settings (value_net="file.npz" loads a value network to score the leaves with)
+def make_agent(config):
+    if 'value_net' in config:
+        from valuenet import open_value_net
+
+        config = dict(config)
+        path = config.pop('value_net')
+        config['evaluator'] = open_value_net(path)
+
+        if config['evaluator'] is None:
+            raise ValueError('there is no value network at %s' % path)
+
+    return MCTS(**config)
+
+#plays one game between two MCTS agents --> returns the winner ('x' or 'o') or None for a draw
+#   (if a moves list is given, each move is added to it as (row, col, playouts, think time), the playouts being the
+#   iterations that search did)
+def play_game(board, agent_x, agent_o, moves=None):
+    agents = {'x': agent_x, 'o': agent_o}
+
+    while not board.is_win() and not board.is_draw():
+        agent = agents[board.player_1]
+
+        start = time.perf_counter()
+        board = agent.search(board).board
+
+        if moves is not None:
+            moves.append(board.last_move + (agent.iteration, time.perf_counter() - start))
+
+    return board.player_2 if board.is_win() else None
+
+#plays a number of games between agents a and b (swapping sides every game) and counts the results
+def evaluate(new_board, config_a, config_b, games, output=None, records=None):
+    results = {'a': 0, 'b': 0, 'draw': 0}
+    lines = []
+    start = time.time()
+
+    for game in range(games):
+        #agent a is "x" (goes first) in even games and "o" in odd games
+        sides = {'x': 'a', 'o': 'b'} if game % 2 == 0 else {'x': 'b', 'o': 'a'}
+        configs = {'a': config_a, 'b': config_b}
+
+        #seeded agents get a different (but still repeatable) seed each game, otherwise every game would be the same
+        configs = {agent: dict(config, seed=config['seed'] + game) if config.get('seed') is not None else config for agent, config in configs.items()}
+
+        board = new_board()
+        moves = []
+
+        #(the agents are closed after the game so their rollout workers don't pile up)
+        with make_agent(configs[sides['x']]) as agent_x, make_agent(configs[sides['o']]) as agent_o:
+            winner = play_game(board, agent_x, agent_o, moves)
+
+        #adds the game to the records file (with each agent's settings as given, so its games can be counted together)
+        if records is not None:
+            result = {'x': 1, 'o': -1, None: 0}[winner]
+            agents = {'a': config_a, 'b': config_b}
+            append_record(records, GameRecord(board.rows, board.columns, board.k, board.gravity, agents[sides['x']], agents[sides['o']], result, moves))
+
+        if winner is None:
+            results['draw'] += 1
+            lines.append('Game %d: Draw' % (game + 1))
+        else:
+            results[sides[winner]] += 1
+            lines.append('Game %d: %s wins (%s)' % (game + 1, winner.upper(), sides[winner].upper()))
+
+        print(lines[-1])
+
+    #saves the results (one line per game)
+    if output is not None:
+        with open(output, 'w') as file:
+            file.write('\n'.join(lines))
+
+    #prints the summary
+    print('\nA: %s\nB: %s' % (config_a, config_b))
+    print('A wins: %d (%.1f%%), B wins: %d (%.1f%%), draws: %d' % (results['a'], 100 * results['a'] / games, results['b'], 100 * results['b'] / games, results['draw']))
+    print('%d games in %.1fs' % (games, time.time() - start))
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play two MCTS agents against each other')
+    parser.add_argument('game', choices=['connect4', 'tictactoe'])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--a', default='', help='MCTS settings for agent A, e.g. iterations=500,rave=True')
+    parser.add_argument('--b', default='', help='MCTS settings for agent B')
+    parser.add_argument('--output', help='file to write the results to (one line per game)')
+    parser.add_argument('--records', help='game records file to add the games to (see gamerecords.py)')
+    args = parser.parse_args()
+
+    if args.game == 'connect4':
+        from connect4 import Board
+    else:
+        from ticktacktoe import Board
+
+    evaluate(Board, parse_agent(args.a), parse_agent(args.b), args.games, args.output, args.records)
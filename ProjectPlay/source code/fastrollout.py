@@ -0,0 +1,237 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Fast rollout code:                                                                                                     #
+# The rollout is where MCTS spends most of its time, playing random moves until the game ends. This code is a rollout    #
+# written in plain Python on flat integer arrays (one number per tile) instead of Board objects, so that Numba can       #
+# compile it (@njit) to machine code. It is only used if Numba is installed, otherwise MCTS uses its normal rollout.     #
+#                                                                                                                        #
+# The random moves come from a small xorshift random number generator inside the kernel, so a rollout with the same      #
+# seed plays the same game whether it is compiled or not. reference_rollout does the same thing with Board objects so    #
+# the two can be checked against each other:  python fastrollout.py                                                      #
+#                                                                                                                        #
+##########################################################################################################################
+
+import math
+import time
+
+#what each tile holds in the flat array
+EMPTY, X, O = 0, 1, 2
+CODES = {'.': EMPTY, 'x': X, 'o': O}
+
+#the compiled kernel (loaded the first time it's needed, since importing Numba is slow)
+kernel = None
+loaded = False
+
+#flat line tables for each board size (as NumPy arrays)
+kernel_tables = {}
+
+#open line values for each k (as NumPy arrays)
+kernel_line_values = {}
+
+#next number from a 32 bit xorshift random number generator
+def xorshift(state):
+    state ^= (state << 13) & 0xFFFFFFFF
+    state ^= state >> 17
+    state ^= (state << 5) & 0xFFFFFFFF
+    return state
+
+#plays random moves until the game ends --> returns the score (1 if "x" wins, -1 if "o" wins and 0 for a draw) and
+#                                            the number of moves played
+#   cells: one number per tile (row by row), changed in place
+#   free_rows: next free row in each column (only used with gravity), changed in place
+#   line_cells: the tiles in each line, cell_line_start/cell_lines: the lines through each tile
+#   moves: space for the legal moves, played: filled in with the tiles played (in order)
+#   depth: most moves to play before stopping and scoring the position like MNKBoard.evaluate (-1 for no limit), with
+#          line_values: value of an open line by number of pieces, scale: what the total is divided by before tanh
+def rollout_kernel(cells, free_rows, gravity, columns, k, line_cells, cell_line_start, cell_lines, to_move, seed, moves, played, depth, line_values, scale):
+    state = seed
+    played_count = 0
+
+    while True:
+        #depth limit reached --> scores the open lines instead of playing on
+        if played_count == depth:
+            total = 0.0
+
+            for line in range(line_cells.shape[0]):
+                x_count = 0
+                o_count = 0
+
+                for j in range(k):
+                    if cells[line_cells[line, j]] == X:
+                        x_count += 1
+                    elif cells[line_cells[line, j]] == O:
+                        o_count += 1
+
+                if o_count == 0:
+                    total += line_values[x_count]
+                elif x_count == 0:
+                    total -= line_values[o_count]
+
+            return math.tanh(total / scale), played_count
+
+        #finds the legal moves
+        count = 0
+
+        if gravity:
+            for col in range(columns):
+                if free_rows[col] >= 0:
+                    moves[count] = free_rows[col] * columns + col
+                    count += 1
+        else:
+            for cell in range(len(cells)):
+                if cells[cell] == EMPTY:
+                    moves[count] = cell
+                    count += 1
+
+        #no moves left --> draw
+        if count == 0:
+            return 0.0, played_count
+
+        #makes a random move (the random number generator is written out here so Numba can compile it, it's the same as xorshift)
+        state ^= (state << 13) & 0xFFFFFFFF
+        state ^= state >> 17
+        state ^= (state << 5) & 0xFFFFFFFF
+        cell = moves[state % count]
+        cells[cell] = to_move
+        played[played_count] = cell
+        played_count += 1
+
+        if gravity:
+            free_rows[cell % columns] -= 1
+
+        #checks the lines through the new piece for a win
+        for i in range(cell_line_start[cell], cell_line_start[cell + 1]):
+            line = cell_lines[i]
+            won = True
+
+            for j in range(k):
+                if cells[line_cells[line, j]] != to_move:
+                    won = False
+                    break
+
+            if won:
+                return (1.0 if to_move == X else -1.0), played_count
+
+        #swaps players
+        to_move = X + O - to_move
+
+#the same rollout as the kernel, but on Board objects (what the kernel's results are checked against)
+def reference_rollout(board, seed, depth=-1):
+    state = seed
+    played_count = 0
+
+    while not board.is_win():
+        if played_count == depth:
+            return board.evaluate()
+
+        moves = board.legal_moves()
+
+        if not moves:
+            return 0
+
+        state = xorshift(state)
+        board = board.make_move(*moves[state % len(moves)])
+        played_count += 1
+
+    return 1 if board.player_2 == 'x' else -1
+
+#compiles the kernel if Numba is installed (returns False if it isn't)
+def available():
+    global kernel, loaded
+
+    if not loaded:
+        loaded = True
+
+        try:
+            from numba import njit
+            kernel = njit(cache=True)(rollout_kernel)
+
+        except ImportError:
+            kernel = None
+
+    return kernel is not None
+
+#flat versions of the board's line tables
+def get_kernel_tables(board):
+    import numpy as np
+
+    if (board.rows, board.columns, board.k) not in kernel_tables:
+        index = {(row, col): row * board.columns + col for row, col in board.position}
+        line_number = {line: number for number, line in enumerate(board.lines)}
+
+        line_cells = np.array([[index[cell] for cell in line] for line in board.lines], dtype=np.int32).reshape(-1, board.k)
+        cell_line_start = np.zeros(len(index) + 1, dtype=np.int32)
+        cell_lines = []
+
+        for cell in board.position:
+            cell_lines += [line_number[line] for line in board.cell_lines[cell]]
+            cell_line_start[index[cell] + 1] = len(cell_lines)
+
+        kernel_tables[board.rows, board.columns, board.k] = (line_cells, cell_line_start, np.array(cell_lines, dtype=np.int32))
+
+    return kernel_tables[board.rows, board.columns, board.k]
+
+#open line values for the kernel (see mnkboard.get_line_values)
+def get_line_values(k):
+    import numpy as np
+    import mnkboard
+
+    if k not in kernel_line_values:
+        kernel_line_values[k] = np.array(mnkboard.get_line_values(k), dtype=np.float64)
+
+    return kernel_line_values[k]
+
+#runs the compiled kernel on a board (the board itself isn't changed)
+#   (if a played list is given, each move is added to it as (player, tile) like MCTS.rollout does, and with a depth
+#   the rollout stops after that many moves and the position is scored like MNKBoard.evaluate)
+def fast_rollout(board, seed, played=None, depth=None):
+    import numpy as np
+    from mnkboard import EVALUATION_SCALE
+
+    line_cells, cell_line_start, cell_lines = get_kernel_tables(board)
+    cells = np.array([CODES[player] for player in board.position.values()], dtype=np.int8)
+    free_rows = np.array(board.free_rows, dtype=np.int32)
+    moves = np.empty(len(cells), dtype=np.int32)
+    played_cells = np.empty(len(cells), dtype=np.int32)
+    to_move = CODES[board.player_1]
+
+    line_values = get_line_values(board.k)
+    score, played_count = kernel(cells, free_rows, board.gravity, board.columns, board.k, line_cells, cell_line_start, cell_lines, to_move, seed, moves, played_cells, -1 if depth is None else depth, line_values, EVALUATION_SCALE)
+
+    #turns the played tiles back into (player, (row, col)), the players take turns starting with the player to move
+    if played is not None:
+        players = (board.player_1, board.player_2)
+
+        for i in range(played_count):
+            played.append((players[i % 2], divmod(int(played_cells[i]), board.columns)))
+
+    return score
+
+#checks the kernel against the reference rollout and compares the speed of the two
+if __name__ == '__main__':
+    from connect4 import Board as Connect4Board
+    from ticktacktoe import Board as TicTacToeBoard
+
+    if not available():
+        print('Numba is not installed, MCTS will use its normal rollout')
+        raise SystemExit
+
+    for name, board in [('Connect4', Connect4Board()), ('TicTacToe', TicTacToeBoard())]:
+        seeds = range(1, 2001)
+
+        start = time.perf_counter()
+        reference = [reference_rollout(board, seed) for seed in seeds]
+        reference_time = time.perf_counter() - start
+
+        fast_rollout(board, 1)
+        start = time.perf_counter()
+        fast = [fast_rollout(board, seed) for seed in seeds]
+        fast_time = time.perf_counter() - start
+
+        print('%s: results match: %s, reference %.0f playouts/sec, kernel %.0f playouts/sec' % (name, reference == fast, len(seeds) / reference_time, len(seeds) / fast_time))
+
+        #cut short rollouts (scored with the static evaluation), the scores only have to match to rounding
+        reference = [reference_rollout(board, seed, 6) for seed in seeds]
+        fast = [fast_rollout(board, seed, depth=6) for seed in seeds]
+        print('%s: depth 6 results match: %s' % (name, all(abs(a - b) < 1e-9 for a, b in zip(reference, fast))))
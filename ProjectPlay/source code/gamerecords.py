@@ -0,0 +1,186 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Game records code:                                                                                                     #
+# Every evaluation game is kept as a small binary record: the board size, the settings of both agents, the result and    #
+# every move with how long the AI thought about it and how many playouts it did. Records are only ever added to the end  #
+# of a file, each one in a single write while holding a lock on the file, so lots of processes can add to the same       #
+# file at once without mixing their records up.                                                                          #
+#                                                                                                                        #
+# The reader goes through a file one record at a time, so files with millions of games can be summed up (win rates for   #
+# each agent's settings, think time percentiles) without loading them:                                                   #
+#   python gamerecords.py results.games [more.games ...]                                                                 #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import json
+import math
+import os
+import struct
+
+#locking is only available on Linux/macOS (on Windows each record still goes in with one appending write)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+#file layout: header, then records one after another
+RECORDS_MAGIC = b'PPGR'
+RECORDS_VERSION = 1
+HEADER = struct.Struct('<4sH')
+
+#each record: its length (not counting this), the board size, the result (1 "x" won, -1 "o" won, 0 draw), the number
+#of moves and the length of each agent's settings (JSON), then the settings and the moves
+LENGTH = struct.Struct('<I')
+GAME = struct.Struct('<BBBBbHHH')
+
+#each move: row, col, playouts and think time (seconds)
+MOVE = struct.Struct('<bbIf')
+
+class GameRecord():
+    def __init__(self, rows, columns, k, gravity, config_x, config_o, result, moves):
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.gravity = gravity
+
+        #settings of the agent playing each side (dicts)
+        self.config_x = config_x
+        self.config_o = config_o
+
+        #1 if "x" won, -1 if "o" won, 0 for a draw
+        self.result = result
+
+        #list of (row, col, playouts, think time)
+        self.moves = moves
+
+    #the record as bytes (with its length in front)
+    def pack(self):
+        config_x = json.dumps(self.config_x, sort_keys=True, default=repr).encode()
+        config_o = json.dumps(self.config_o, sort_keys=True, default=repr).encode()
+
+        data = GAME.pack(self.rows, self.columns, self.k, self.gravity, self.result, len(self.moves), len(config_x), len(config_o)) + config_x + config_o
+        data += b''.join(MOVE.pack(*move) for move in self.moves)
+
+        return LENGTH.pack(len(data)) + data
+
+    @classmethod
+    def unpack(cls, data):
+        rows, columns, k, gravity, result, move_count, x_length, o_length = GAME.unpack_from(data, 0)
+
+        offset = GAME.size
+        config_x = json.loads(data[offset:offset + x_length])
+        config_o = json.loads(data[offset + x_length:offset + x_length + o_length])
+
+        offset += x_length + o_length
+        moves = [MOVE.unpack_from(data, offset + i * MOVE.size) for i in range(move_count)]
+
+        return cls(rows, columns, k, bool(gravity), config_x, config_o, result, moves)
+
+#adds a game to the end of a records file (making the file if it doesn't exist)
+def append_record(path, record):
+    data = record.pack()
+    file = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+
+    try:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+
+        #a new file gets its header first (under the lock, so only one writer does it)
+        if os.fstat(file).st_size == 0:
+            data = HEADER.pack(RECORDS_MAGIC, RECORDS_VERSION) + data
+
+        os.write(file, data)
+
+    finally:
+        os.close(file)
+
+#goes through the records in a file one at a time (a record that was only half written at the end is skipped)
+def read_records(path):
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+
+        if len(header) < HEADER.size or HEADER.unpack(header) != (RECORDS_MAGIC, RECORDS_VERSION):
+            raise ValueError('%s is not a version %d game records file' % (path, RECORDS_VERSION))
+
+        while True:
+            length = file.read(LENGTH.size)
+
+            if len(length) < LENGTH.size:
+                break
+
+            length, = LENGTH.unpack(length)
+            data = file.read(length)
+
+            if len(data) < length:
+                break
+
+            yield GameRecord.unpack(data)
+
+#counts values into buckets that get 10% wider each time, so percentiles can be worked out from any number of values
+#in a fixed amount of memory (to within 10%)
+class Histogram():
+    def __init__(self, smallest=1e-5, growth=1.1):
+        self.smallest = smallest
+        self.growth = growth
+        self.counts = {}
+        self.total = 0
+
+    def add(self, value):
+        bucket = 0 if value <= self.smallest else int(math.log(value / self.smallest, self.growth)) + 1
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+
+    #value below which the given percent of the values fall (the top of its bucket)
+    def percentile(self, percent):
+        target = self.total * percent / 100
+        seen = 0
+
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+
+            if seen >= target:
+                return self.smallest * self.growth ** bucket
+
+        return 0
+
+#sums up records files --> returns the results for each agent's settings (as JSON) and the think time histogram
+def summarize(paths):
+    agents = {}
+    think_times = Histogram()
+    games = 0
+
+    for path in paths:
+        for record in read_records(path):
+            games += 1
+
+            for config, sign in ((record.config_x, 1), (record.config_o, -1)):
+                stats = agents.setdefault(json.dumps(config, sort_keys=True), {'games': 0, 'wins': 0, 'losses': 0, 'draws': 0})
+                stats['games'] += 1
+
+                if record.result == 0:
+                    stats['draws'] += 1
+                elif record.result == sign:
+                    stats['wins'] += 1
+                else:
+                    stats['losses'] += 1
+
+            for row, col, playouts, think_time in record.moves:
+                think_times.add(think_time)
+
+    return games, agents, think_times
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sum up game records files')
+    parser.add_argument('paths', nargs='+')
+    args = parser.parse_args()
+
+    games, agents, think_times = summarize(args.paths)
+    print('%d games' % games)
+
+    for config, stats in sorted(agents.items()):
+        print('%s: %d games, win rate %.1f%% (%d wins, %d losses, %d draws)' % (config, stats['games'], 100 * stats['wins'] / stats['games'], stats['wins'], stats['losses'], stats['draws']))
+
+    if think_times.total:
+        print('think time: p50 %.1fms, p90 %.1fms, p99 %.1fms' % tuple(1000 * think_times.percentile(percent) for percent in (50, 90, 99)))
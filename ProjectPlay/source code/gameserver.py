@@ -0,0 +1,229 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Game server code:                                                                                                      #
+# This is a headless server that hosts lots of TicTacToe/Connect4 games at once. Clients connect over TCP and send one   #
+# JSON message per line, the server replies with one JSON message per line:                                              #
+#   {"op": "new", "game": "connect4", "ai_first": false}    --> {"ok": true, "session": "...", "board": [...], ...}      #
+#   {"op": "move", "session": "...", "move": [row, col]}    --> the player's move and the AI's reply                     #
+#   {"op": "close", "session": "..."}                                                                                    #
+# (for Connect4 the row of a move is ignored, the piece drops down the column)                                           #
+#                                                                                                                        #
+# The asyncio event loop only handles the messages. The MCTS searches run in a shared pool of worker processes, each     #
+# with a time budget. Searches wait their turn in the order they were asked for (so every game gets its fair share) and  #
+# if too many are already waiting, new moves are turned away with "server busy" instead of queueing forever.             #
+#                                                                                                                        #
+# To run:  python gameserver.py --port 8765 --workers 4 --budget-ms 200                                                  #
+# (loadclient.py plays lots of games against it and reports the move times)                                              #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from connect4 import Board as Connect4Board
+from ticktacktoe import Board as TicTacToeBoard
+from mcts import MCTS
+
+GAMES = {'connect4': Connect4Board, 'tictactoe': TicTacToeBoard}
+
+#least seconds a search is given (with less the AI hardly looks at any moves)
+MIN_BUDGET = 0.01
+
+#runs in a worker process: searches the board and returns the AI's move and how many playouts it did
+def search_move(board, config):
+    with MCTS(**config) as mcts:
+        best_move = mcts.search(board)
+        return best_move.board.last_move, mcts.iteration
+
+#the move in a message as a tuple --> [row, col], or just [col] with gravity (raises ValueError if it isn't one)
+def get_move(message, board):
+    move = message.get('move')
+
+    if not isinstance(move, list) or len(move) not in ((1, 2) if board.gravity else (2,)) or not all(type(part) is int for part in move):
+        raise ValueError('a move is [row, col]' + (' or [col]' if board.gravity else ''))
+
+    return tuple(move)
+
+#checks a move is legal (with gravity only the column matters)
+def is_legal(board, move):
+    if board.is_win() or board.is_draw():
+        return False
+
+    if board.gravity:
+        return move[-1] in [col for row, col in board.legal_moves()]
+
+    return move in board.legal_moves()
+
+#the board as JSON (rows as strings, whose turn it is, the legal moves and the result if the game is over)
+def board_state(board):
+    state = {
+        'board': [''.join(board.position[row, col] for col in range(board.columns)) for row in range(board.rows)],
+        'to_move': board.player_1,
+        'moves': board.legal_moves(),
+        'result': None,
+    }
+
+    if board.is_win():
+        state['result'] = board.player_2
+    elif board.is_draw():
+        state['result'] = 'draw'
+
+    return state
+
+class GameServer():
+    def __init__(self, workers, budget_ms, max_queue, config=None):
+        self.pool = ProcessPoolExecutor(workers)
+
+        #MCTS settings for the AI (the time budget stops each search, the iterations are just an upper limit)
+        self.budget = max(budget_ms / 1000, MIN_BUDGET)
+        self.config = dict(config or {})
+        self.config.setdefault('iterations', 1000000)
+
+        #only as many searches run at once as there are workers, the rest wait in line (asyncio semaphores are first
+        #come first served)
+        self.slots = asyncio.Semaphore(workers)
+        self.max_queue = max_queue
+        self.waiting = 0
+
+        #games being played (session id --> board)
+        self.sessions = {}
+
+    #AI makes its move in a game
+    async def ai_move(self, board, budget):
+        #backpressure: turn the move away if the queue is already full
+        if self.waiting >= self.max_queue:
+            raise RuntimeError('server busy')
+
+        self.waiting += 1
+
+        try:
+            async with self.slots:
+                start = time.perf_counter()
+                config = dict(self.config, time_limit=budget)
+                move, playouts = await asyncio.get_running_loop().run_in_executor(self.pool, search_move, board, config)
+                think_ms = (time.perf_counter() - start) * 1000
+        finally:
+            self.waiting -= 1
+
+        return board.make_move(*move), {'ai_move': move, 'playouts': playouts, 'think_ms': round(think_ms, 1)}
+
+    #handles one message --> returns the reply
+    async def handle(self, message, owned):
+        if not isinstance(message, dict):
+            raise ValueError('a message is a JSON object')
+
+        op = message.get('op')
+
+        if op == 'new':
+            board = GAMES[message.get('game', 'connect4')]()
+            reply = {}
+
+            if message.get('ai_first'):
+                board, reply = await self.ai_move(board, self.get_budget(message))
+
+            session = uuid.uuid4().hex
+            self.sessions[session] = board
+            owned.add(session)
+
+            return dict(reply, ok=True, session=session, **board_state(board))
+
+        if op == 'move':
+            session = message['session']
+            board = self.sessions[session]
+
+            #checks the move is legal
+            move = get_move(message, board)
+            if not is_legal(board, move):
+                raise ValueError('illegal move')
+
+            #player's move
+            board = board.make_move(*move)
+            reply = {}
+
+            #AI's move
+            if not board.is_win() and not board.is_draw():
+                board, reply = await self.ai_move(board, self.get_budget(message))
+
+            self.sessions[session] = board
+
+            return dict(reply, ok=True, session=session, **board_state(board))
+
+        if op == 'close':
+            self.sessions.pop(message['session'], None)
+            owned.discard(message['session'])
+            return {'ok': True}
+
+        raise ValueError('unknown op %r' % op)
+
+    #time budget for a search (a client can ask for less time than the server's budget but not more, and never less
+    #than MIN_BUDGET)
+    def get_budget(self, message):
+        if 'budget_ms' not in message:
+            return self.budget
+
+        budget_ms = message['budget_ms']
+
+        #(bools are ints in Python and NaN isn't > 0, so both are turned away)
+        if isinstance(budget_ms, bool) or not isinstance(budget_ms, (int, float)) or not budget_ms > 0:
+            raise ValueError('budget_ms is a positive number of milliseconds')
+
+        return max(min(self.budget, budget_ms / 1000), MIN_BUDGET)
+
+    #one client connection (messages are handled one at a time, in order)
+    async def client(self, reader, writer):
+        #sessions started on this connection (closed when the connection closes)
+        owned = set()
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                try:
+                    reply = await self.handle(json.loads(line), owned)
+                except (ValueError, KeyError, TypeError, RuntimeError) as error:
+                    reply = {'ok': False, 'error': str(error)}
+
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+
+        except ConnectionError:
+            pass
+
+        finally:
+            for session in owned:
+                self.sessions.pop(session, None)
+
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.client, host, port, limit=1 << 16)
+        print('serving on %s:%d' % (host, port))
+
+        async with server:
+            await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless server for lots of TicTacToe/Connect4 games at once')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of search processes')
+    parser.add_argument('--budget-ms', type=float, default=200, help='time budget for each AI move')
+    parser.add_argument('--max-queue', type=int, default=1000, help='most AI moves waiting before new ones are turned away')
+    args = parser.parse_args()
+
+    async def main():
+        game_server = GameServer(args.workers, args.budget_ms, args.max_queue)
+        await game_server.serve(args.host, args.port)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
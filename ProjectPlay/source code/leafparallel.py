@@ -0,0 +1,118 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Leaf parallel rollout code:                                                                                            #
+# With leaf parallelism the main process still does the selection and expansion, but instead of doing one rollout at a   #
+# time it picks a batch of leaves and hands them to a pool of rollout worker processes, then backpropagates all of the   #
+# scores that come back.                                                                                                 #
+#                                                                                                                        #
+# The workers are started once and kept running. The leaves are passed as one byte per tile (Board.cells) written        #
+# straight into a block of shared memory that every worker can see, and the scores are written back into the same        #
+# block. The only thing sent through the pipes is which slots each worker should do, so the cost of sending a batch      #
+# stays small next to the rollouts themselves.                                                                           #
+#                                                                                                                        #
+##########################################################################################################################
+
+import multiprocessing as mp
+import struct
+from multiprocessing import shared_memory
+
+#each score is written back as a double
+SCORE = struct.Struct('d')
+
+#runs in each worker process: waits for a range of slots, rolls them out and writes the scores back
+def rollout_worker(connection, memory_name, board, batch_size, fast_rollout, seed, rollout_depth):
+    from mcts import MCTS
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    cell_count = board.rows * board.columns
+    scores_offset = batch_size * cell_count
+    #(each worker has its own random stream, so the workers never repeat each other's rollouts)
+    mcts = MCTS(fast_rollout=fast_rollout, seed=seed, rollout_depth=rollout_depth)
+
+    try:
+        while True:
+            task = connection.recv()
+
+            #None --> shut down
+            if task is None:
+                break
+
+            first, last = task
+
+            for slot in range(first, last):
+                cells = bytes(memory.buf[slot * cell_count:(slot + 1) * cell_count])
+                score = mcts.rollout(board.load_cells(cells))
+                SCORE.pack_into(memory.buf, scores_offset + slot * SCORE.size, score)
+
+            connection.send(last - first)
+
+    finally:
+        memory.close()
+
+class RolloutPool():
+    #class constructor --> seeds: one seed per worker (None --> seeded from the OS)
+    #                      rollout_depth: depth limit for the workers' rollouts (see MCTS)
+    def __init__(self, board, workers, batch_size, fast_rollout=True, seeds=None, rollout_depth=None):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.cell_count = board.rows * board.columns
+
+        #which board size the pool is for
+        self.size = (board.rows, board.columns, board.k, board.gravity)
+
+        #shared memory: the leaves (one byte per tile each) and then the scores (one double each)
+        self.scores_offset = batch_size * self.cell_count
+        self.memory = shared_memory.SharedMemory(create=True, size=self.scores_offset + batch_size * SCORE.size)
+
+        #starts the workers (each gets an empty board to load the leaves into)
+        self.connections = []
+        self.processes = []
+
+        for worker in range(workers):
+            seed = seeds[worker] if seeds is not None else None
+            parent_connection, child_connection = mp.Pipe()
+            process = mp.Process(target=rollout_worker, args=(child_connection, self.memory.name, board.__class__(board), batch_size, fast_rollout, seed, rollout_depth), daemon=True)
+            process.start()
+
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    #checks the pool was made for boards of this size
+    def fits(self, board):
+        return self.size == (board.rows, board.columns, board.k, board.gravity)
+
+    #rolls out a batch of boards across the workers --> returns their scores (in the same order)
+    def rollout(self, boards):
+        #writes the leaves into shared memory
+        for slot, board in enumerate(boards):
+            self.memory.buf[slot * self.cell_count:(slot + 1) * self.cell_count] = board.cells()
+
+        #splits the slots evenly between the workers (always the same way, so a seeded search plays out the same)
+        busy = []
+        share = -(-len(boards) // self.workers)
+
+        for worker, connection in enumerate(self.connections):
+            first = worker * share
+            last = min(len(boards), first + share)
+
+            if first < last:
+                connection.send((first, last))
+                busy.append(connection)
+
+        #waits for every worker to finish
+        for connection in busy:
+            connection.recv()
+
+        return [SCORE.unpack_from(self.memory.buf, self.scores_offset + slot * SCORE.size)[0] for slot in range(len(boards))]
+
+    #stops the workers and frees the shared memory
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+
+        for process in self.processes:
+            process.join()
+
+        self.memory.close()
+        self.memory.unlink()
@@ -0,0 +1,88 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Load client code:                                                                                                      #
+# This code tests the game server (gameserver.py) by playing lots of games against it at the same time. Each game has    #
+# its own connection and plays random legal moves. At the end it prints how long the server took to reply to each move   #
+# (50th and 99th percentile) and how many games per second were finished.                                                #
+#                                                                                                                        #
+# Example:  python loadclient.py --games 200 --duration 30 --game connect4                                               #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+#sends one message and waits for the reply
+async def request(reader, writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+#plays games one after another on one connection until the time is up
+async def player(host, port, game, budget_ms, stop_time, latencies, stats):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    try:
+        while time.perf_counter() < stop_time:
+            reply = await request(reader, writer, {'op': 'new', 'game': game})
+            session = reply['session']
+
+            while reply.get('ok') and reply['result'] is None and time.perf_counter() < stop_time:
+                #random legal move, timed from sending it to getting the AI's reply
+                start = time.perf_counter()
+                message = {'op': 'move', 'session': session, 'move': random.choice(reply['moves']), 'budget_ms': budget_ms}
+                new_reply = await request(reader, writer, message)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+                #server busy --> tries the move again
+                if not new_reply['ok']:
+                    stats['rejected'] += 1
+                    continue
+
+                reply = new_reply
+
+            if reply.get('result') is not None:
+                stats['games'] += 1
+
+            await request(reader, writer, {'op': 'close', 'session': session})
+
+    finally:
+        writer.close()
+
+#value below which the given percent of the (sorted) values fall
+def percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+async def main(args):
+    latencies = []
+    stats = {'games': 0, 'rejected': 0}
+
+    start = time.perf_counter()
+    stop_time = start + args.duration
+
+    await asyncio.gather(*[player(args.host, args.port, args.game, args.budget_ms, stop_time, latencies, stats) for _ in range(args.games)])
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    print('%d concurrent games for %.1fs' % (args.games, elapsed))
+    print('moves: %d, rejected (server busy): %d' % (len(latencies), stats['rejected']))
+
+    if latencies:
+        print('move latency: p50 %.1fms, p99 %.1fms' % (percentile(latencies, 50), percentile(latencies, 99)))
+
+    print('games finished: %d (%.2f games/sec)' % (stats['games'], stats['games'] / elapsed))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test for gameserver.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--game', choices=['connect4', 'tictactoe'], default='connect4')
+    parser.add_argument('--games', type=int, default=100, help='number of games played at the same time')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run for')
+    parser.add_argument('--budget-ms', type=float, default=50, help='time budget asked for on each AI move')
+    asyncio.run(main(parser.parse_args()))
@@ -13,7 +13,16 @@
 ##########################################################################################################################
 
 import math
-import random
+import os
+import struct
+import sys
+import time
+import fastrollout
+import treestore
+from randomstream import RandomStream
+
+#how many iterations between checks for stopping early
+EARLY_STOP_INTERVAL = 100
 
 class TreeNode():
     #class constructor --> (make a tree node class)
@@ -40,35 +49,366 @@ class TreeNode():
         #init total score of node
         self.score = 0
 
-        #init current node's children
+        #init current node's children (by move)
         self.children = {}
 
+        #moves that haven't been expanded yet (worked out the first time the node is expanded)
+        self.untried_moves = None
+
+        #iteration this node was last visited on (used to pick which nodes to prune)
+        self.touched = 0
+
+        #all-moves-as-first (RAVE) visits and score: counted whenever this node's move is played later in a simulation
+        self.amaf_visits = 0
+        self.amaf_score = 0
+
 class MCTS():
+    #class constructor --> iterations: number of iterations per search
+    #                      time_limit: most seconds a search can take (stops early if the iterations aren't done)
+    #                      symmetry: treat moves that lead to flipped/rotated copies of the same position as one move
+    #                      move_order: expand moves nearest the centre of the board first
+    #                      book: opening book (see openingbook.py) that is checked before searching
+    #                      fast_rollout: use the compiled rollout kernel (see fastrollout.py) if Numba is installed
+    #                      rave: also score moves by every simulation they were played in (all-moves-as-first)
+    #                      rave_equivalence: number of visits at which the real and RAVE scores count the same
+    #                      max_nodes/max_bytes: limit on the size of the tree, when it gets bigger the least visited
+    #                                           subtrees are pruned (their statistics stay in their parent)
+    #                      leaf_workers: number of worker processes to do the rollouts in (leaf parallel, see leafparallel.py)
+    #                      leaf_batch: number of leaves picked before they are sent to the workers together
+    #                      tree_path: tree file (see treestore.py) to warm start from when there's no tree to reuse
+    #                      seed: seed for the search's own random numbers (None --> different every run)
+    #                      evaluator: scores leaves in batches instead of rollouts (anything with evaluate(boards) -->
+    #                                 scores, e.g. a ValueNet from valuenet.py)
+    #                      rollout_depth: most moves a rollout plays before it stops and scores the position with the
+    #                                     board's static evaluation (None --> plays to the end of the game)
+    #                      time_management: play forced moves, wins and blocks without searching, play the most
+    #                                       visited move, stop once it can't change and do more iterations when it
+    #                                       isn't the best scoring move (never going past time_limit)
+    def __init__(self, iterations=1000, time_limit=None, symmetry=False, move_order=False, book=None, fast_rollout=True, rave=False, rave_equivalence=300, max_nodes=None, max_bytes=None, leaf_workers=0, leaf_batch=32, tree_path=None, seed=None, evaluator=None, rollout_depth=None, time_management=True):
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.symmetry = symmetry
+        self.move_order = move_order
+        self.book = book
+        self.fast_rollout = fast_rollout
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.leaf_workers = leaf_workers
+        self.leaf_batch = leaf_batch
+        self.evaluator = evaluator
+        self.rollout_depth = rollout_depth
+        self.time_management = time_management
+
+        #random numbers for the rollouts and tie breaks (see randomstream.py)
+        self.random = RandomStream(seed)
+
+        #pool of rollout workers (started on the first leaf parallel search and kept for the next searches)
+        self.pool = None
+
+        #tree from the last search, and the root of the first search of the game (what gets saved for warm starts)
+        self.tree_path = tree_path
+        self.root = None
+        self.game_root = None
+
+        #visits and score the game's tree already has in the tree file, by node (so saving only adds what's new)
+        self.saved_stats = {}
+
+        #number of iterations (playouts) the last search did, 0 if its move came from the book or was played straight
+        #away (the root's visits also count the visits reused from earlier searches)
+        self.iteration = 0
+
     #search for best move in current position
     def search(self, startstate):
-        #init root node
-        self.root = TreeNode(startstate, None)
+        #when the search has to stop by
+        start = time.perf_counter()
+
+        if self.time_limit is not None:
+            deadline = start + self.time_limit
+
+        self.iteration = 0
+
+        #an evaluator made for a different board size (e.g. a Connect4 value network in a TicTacToe search) can't score
+        #this board
+        if hasattr(self.evaluator, 'fits') and not self.evaluator.fits(startstate):
+            raise ValueError('the evaluator was made for a different board size than %dx%d' % (startstate.rows, startstate.columns))
+
+        #init root node (carrying on from the last search, or from the tree file, if the position is in them)
+        self.root = self.warm_start(startstate)
+        self.node_count = self.count_nodes(self.root)
+
+        #(the nodes kept above the root for saving the game's tree count towards the limit too)
+        self.node_limit = self.get_node_limit(startstate, self.count_nodes(self.game_root) - self.node_count)
+
+        #if the position is in the opening book, play the book move straight away
+        if self.book is not None:
+            book_board = self.book.lookup(startstate)
+
+            if book_board is not None:
+                return self.get_move_node(book_board.last_move)
+
+        #forced moves, wins and blocks are played straight away
+        if self.time_management and not self.root.is_terminal:
+            move = self.get_instant_move(startstate)
+
+            if move is not None:
+                return self.get_move_node(move)
 
         #number of iterations
-        n = 1000
+        n = self.iterations
 
         #look at n iterations
-        for iteration in range(n):
+        next_check = EARLY_STOP_INTERVAL
+        extended = False
+
+        while True:
+            out_of_time = self.time_limit is not None and time.perf_counter() >= deadline
+
+            #out of iterations or time
+            if self.iteration >= n or out_of_time:
+                #the most visited move isn't the best scoring one --> half as many iterations again (once, and only
+                #while there's time left, the time limit is never extended)
+                if self.time_management and not extended and not out_of_time and self.is_unsettled():
+                    extended = True
+                    n += self.iterations // 2
+                    continue
+
+                break
+
+            #stops early if the best move can't be caught in the iterations (or time) that are left
+            if self.time_management and self.iteration >= next_check:
+                next_check = self.iteration + EARLY_STOP_INTERVAL
+                remaining = n - self.iteration
+
+                if self.time_limit is not None:
+                    now = time.perf_counter()
+                    remaining = min(remaining, self.iteration / (now - start) * (deadline - now))
+
+                if self.is_decided(remaining):
+                    break
+
+            #leaf parallel or with an evaluator: a batch of iterations with the leaves scored together
+            if self.leaf_workers or self.evaluator is not None:
+                self.run_batch(min(self.leaf_batch, n - self.iteration))
+
+            else:
+                #select node (selection phase)
+                node = self.select(self.root)
+
+                #moves played in the rollout (only kept for RAVE)
+                played = [] if self.rave else None
+
+                #score current node (simulation phase)
+                score = self.rollout(node.board, played)
+
+                #backpropagate the number of visits and score up to the root node
+                self.backpropagate(node, score, played)
+                self.iteration += 1
+
+            #keeps the tree within its memory limit
+            if self.node_limit is not None and self.node_count > self.node_limit:
+                self.prune()
+
+        #game already over --> there's no move to pick
+        if self.root.is_terminal:
+            return None
+
+        #no time to look at any move (e.g. a time limit of 0) --> a random legal move
+        if not self.root.children:
+            return self.get_move_node(self.random.choice(startstate.legal_moves()))
+
+        #pick up the best move in the current position: with time management the most visited move (what stopping
+        #early and the extra iterations go by, so stopping early never changes the move), otherwise the best scoring one
+        if self.time_management:
+            return self.get_visit_order()[0]
+
+        return self.get_best_move(self.root, 0)
+
+    #the root's child for a move played without searching (with its statistics if the tree already has it)
+    def get_move_node(self, move):
+        if move in self.root.children:
+            return self.root.children[move]
+
+        return TreeNode(self.root.board.make_move(*move), self.root)
+
+    #a move that doesn't need searching: the only legal move, a move that wins straight away or the only move that
+    #stops the other player winning next move (None if the position needs searching)
+    def get_instant_move(self, board):
+        moves = board.legal_moves()
+
+        if len(moves) == 1:
+            return moves[0]
+
+        wins = board.winning_moves(board.player_1)
+        if wins:
+            return wins[0]
+
+        #(with two or more threats the game is lost anyway, so the search picks the move)
+        blocks = board.winning_moves(board.player_2)
+        if len(blocks) == 1:
+            return blocks[0]
+
+        return None
+
+    #the root's children, most visited first
+    def get_visit_order(self):
+        return sorted(self.root.children.values(), key=lambda child_node: child_node.visits, reverse=True)
+
+    #checks if the most visited move (which is what search returns with time management) is further ahead in visits
+    #than the iterations left, so nothing can catch it, and is the best scoring move too
+    def is_decided(self, remaining):
+        children = self.get_visit_order()
+
+        if len(children) < 2 or not self.root.is_fully_expanded:
+            return False
+
+        return children[0] is self.get_best_move(self.root, 0) and children[0].visits - children[1].visits > remaining
+
+    #checks if the most visited move (the one search would return) and the best scoring move are different (the search
+    #hasn't settled on a move, more visits will go to the better scoring one)
+    def is_unsettled(self):
+        children = self.get_visit_order()
+
+        if len(children) < 2:
+            return False
+
+        return children[0] is not self.get_best_move(self.root, 0)
+
+    #root node for a search: the node for the position from the last search's tree if it's there (e.g. after the
+    #player's reply), otherwise from the tree file, otherwise a new node
+    def warm_start(self, board):
+        if self.root is not None:
+            node = self.find_node(self.root, board)
+
+            if node is not None:
+                #the node becomes the new root. What's above it is only kept for saving the game's tree (see save_tree)
+                self.trim_path(node)
+                return node
+
+        if self.tree_path is not None and os.path.exists(self.tree_path):
+            try:
+                node = treestore.load_tree(self.tree_path, board, self)
+
+            #stale or broken tree files are ignored
+            except (ValueError, OSError, struct.error):
+                node = None
+
+            if node is not None:
+                self.game_root = node
+                self.saved_stats = self.get_stats(node)
+                return node
+
+        self.game_root = TreeNode(board, None)
+        self.saved_stats = {}
+        return self.game_root
+
+    #cuts the tree above a node down to the path to it: the other moves along the path keep their visits and score but
+    #lose their subtrees (like pruning), so the positions already played don't keep using memory
+    def trim_path(self, node):
+        while node.parent_node is not None:
+            for child_node in node.parent_node.children.values():
+                if child_node is not node and child_node.children:
+                    child_node.children = {}
+                    child_node.untried_moves = None
+                    child_node.is_fully_expanded = False
+
+            node = node.parent_node
+
+    #finds the node for a board below the given node (only following moves that are on the board)
+    def find_node(self, node, board):
+        if node.board.ply == board.ply:
+            return node if node.board.key() == board.key() else None
+
+        if node.board.ply < board.ply:
+            for move, child_node in node.children.items():
+                if board.position[move] == child_node.board.player_2:
+                    found = self.find_node(child_node, board)
+
+                    if found is not None:
+                        return found
+
+        return None
+
+    #number of nodes in a tree
+    def count_nodes(self, node):
+        nodes = [node]
+        for node in nodes:
+            nodes.extend(node.children.values())
+
+        return len(nodes)
+
+    #adds the game's tree (from the first search of the game) to the tree file so a new game or process can warm start
+    #from it
+    def save_tree(self, path=None):
+        path = path or self.tree_path
+
+        if path is not None and self.game_root is not None:
+            treestore.merge_tree(self.game_root, path, self, self.saved_stats)
+            self.saved_stats = self.get_stats(self.game_root)
+
+    #visits and score of every node in a tree (by node)
+    def get_stats(self, node):
+        nodes = [node]
+        for node in nodes:
+            nodes.extend(node.children.values())
+
+        return {node: (node.visits, node.score) for node in nodes}
+
+    #batched iterations: selects a batch of leaves, scores them all at once (with the evaluator, or rollouts in the
+    #worker pool) and then backpropagates the scores (RAVE isn't updated here since only the scores come back)
+    def run_batch(self, size):
+        leaves = []
+
+        for _ in range(size):
             #select node (selection phase)
             node = self.select(self.root)
 
-            #score current node (simulation phase)
-            score = self.rollout(node.board)
+            #virtual visit: counts the path as visited already so the next selections spread out to other leaves
+            self.add_visits(node, 1)
+            leaves.append(node)
+
+        #score all the leaves at once, with the evaluator or in the worker processes (simulation phase)
+        if self.evaluator is not None:
+            scores = self.evaluator.evaluate([node.board for node in leaves])
+        else:
+            scores = self.get_pool(self.root.board).rollout([node.board for node in leaves])
 
-            #backpropagate the number of visits and score up to the root node
+        #takes the virtual visits back off and backpropagates the real scores
+        for node, score in zip(leaves, scores):
+            self.add_visits(node, -1)
             self.backpropagate(node, score)
 
-        #pick up the best move in the current position
-        try:
-            return self.get_best_move(self.root, 0)
+        self.iteration += size
+
+    #adds to the visits of a node and everything above it
+    def add_visits(self, node, visits):
+        while node is not None:
+            node.visits += visits
+            node = node.parent_node
 
-        except:
-            pass
+    #the pool of rollout workers (started the first time it's needed, or again if the board size changes)
+    def get_pool(self, board):
+        if self.pool is None or not self.pool.fits(board):
+            from leafparallel import RolloutPool
+
+            self.close()
+            self.pool = RolloutPool(board, self.leaf_workers, self.leaf_batch, self.fast_rollout, self.random.spawn(self.leaf_workers), self.rollout_depth)
+
+        return self.pool
+
+    #stops the rollout workers (if there are any)
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    #"with MCTS(...) as mcts:" closes the rollout workers at the end
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        self.close()
 
     # select most promising node
     def select(self, node):
@@ -87,38 +427,71 @@ class MCTS():
     
     #expand node
     def expand(self, node):
-        #generate legal states (moves) for the given node
-        states = node.board.generate_states()
-
-        #loop over generated states (moves)
-        for state in states:
-            #make sure that current state (move) is not present in child nodes
-            if str(state.position) not in node.children:
-                #create a new node 
-                new_node = TreeNode(state, node)
-
-                #add child node to parent's node children list (dict)
-                node.children[str(state.position)] = new_node
-
-                #case when node is fully expanded or not
-                if len(states) == len(node.children):
-                    node.is_fully_expanded = True
-                
-                #return newly created node
-                return new_node
-            
-        #debugging
-        print('should not get here!')
+        #works out the untried moves the first time the node is expanded
+        if node.untried_moves is None:
+            node.untried_moves = self.get_untried_moves(node.board)
+
+        #takes the next untried move (only the board for this one move is made)
+        move = node.untried_moves.pop()
+
+        #create a new node 
+        new_node = TreeNode(node.board.make_move(*move), node)
+
+        #add child node to parent's node children list (dict)
+        node.children[move] = new_node
+        self.node_count += 1
+
+        #case when node is fully expanded or not
+        if not node.untried_moves:
+            node.is_fully_expanded = True
+
+        #return newly created node
+        return new_node
+
+    #list of moves to expand, in reverse (they are popped off the end)
+    def get_untried_moves(self, board):
+        #with symmetry on, moves that lead to symmetric positions are only tried once (they have the same value).
+        #The move kept is a real move on this board, so the move returned by search never needs mapping back
+        if self.symmetry:
+            moves = board.unique_moves()
+        else:
+            moves = board.legal_moves()
+
+        #nearest the centre last so it is tried first
+        if self.move_order:
+            moves.sort(key=lambda move: abs(move[0] - (board.rows - 1) / 2) + abs(move[1] - (board.columns - 1) / 2), reverse=True)
+
+        #otherwise in the order the board lists them
+        else:
+            moves.reverse()
 
+        return moves
 
     # rollout: simulate the game by making random moves until reach end of game
-    def rollout(self, board):
-        #make random moves for both sides until terminal state of game is reached
+    #          (if a played list is given, each move is added to it as (player, tile))
+    def rollout(self, board, played=None):
+        #uses the compiled kernel if Numba is installed (otherwise falls back to the Python rollout below)
+        if self.fast_rollout and not board.is_win() and fastrollout.available():
+            return fastrollout.fast_rollout(board, self.random.seed32(), played, self.rollout_depth)
+
+        #make random moves for both sides until terminal state of game is reached (or the depth limit)
+        depth = 0
+
         while not board.is_win():
+            #depth limit reached --> static score instead of playing on
+            if depth == self.rollout_depth:
+                return board.evaluate()
+
             #try to make a move
             try:
-                #make a move on board
-                board = random.choice(board.generate_states())
+                #make a random legal move on board
+                board = board.make_move(*self.random.choice(board.legal_moves()))
+
+                #remember the move for RAVE
+                if played is not None:
+                    played.append((board.player_2, board.last_move))
+
+                depth += 1
                 
             #no moves available
             except:
@@ -131,7 +504,14 @@ class MCTS():
         elif board.player_2 == 'o': return -1
 
     # backpropagate no of visits and score back to the root node
-    def backpropagate(self, node, score):
+    def backpropagate(self, node, score, played=None):
+        #for RAVE: the tiles each player played after the current node (starting with the rollout moves)
+        if played is not None:
+            played_after = {'x': set(), 'o': set()}
+
+            for player, cell in played:
+                played_after[player].add(cell)
+
         #update nodes visit count and score up to root node
         while node is not None:
             #update node visits
@@ -140,10 +520,75 @@ class MCTS():
             #update the node score
             node.score += score
 
+            #update when the node was last visited
+            node.touched = self.iteration
+
+            if played is not None:
+                #children whose move the player to move here went on to play later also get the score (all-moves-as-first)
+                later_moves = played_after[node.board.player_1]
+
+                for child_node in node.children.values():
+                    if child_node.board.last_move in later_moves:
+                        child_node.amaf_visits += 1
+                        child_node.amaf_score += score
+
+                #the move that led to this node was played after its parent
+                if node.board.last_move is not None:
+                    played_after[node.board.player_2].add(node.board.last_move)
+
             #make that node a parent node
             node = node.parent_node
 
 
+    #the most nodes the tree can have, less the nodes kept outside it (None for no limit)
+    def get_node_limit(self, board, retained=0):
+        limits = []
+
+        if self.max_nodes is not None:
+            limits.append(self.max_nodes)
+
+        #rough size of a node and its board in memory (a bit more than the real size, since dicts grow in steps)
+        if self.max_bytes is not None:
+            node = TreeNode(board, None)
+            node_bytes = sum(sys.getsizeof(part) for part in (node, node.__dict__, node.children, board, board.__dict__, board.position, board.free_rows))
+            limits.append(self.max_bytes // node_bytes)
+
+        return max(min(limits) - retained, 2) if limits else None
+
+    #prunes the least visited (and then least recently visited) subtrees until the tree is back to 3/4 of its limit.
+    #A pruned node keeps its visits and score (they already include its subtree) but loses its children, so it can be
+    #expanded again later if the search comes back to it
+    def prune(self):
+        #every node in the tree
+        nodes = [self.root]
+        for node in nodes:
+            nodes.extend(node.children.values())
+
+        #nodes that have children (except the root), least visited first
+        candidates = sorted((node for node in nodes if node.children and node is not self.root), key=lambda node: (node.visits, node.touched))
+        pruned = set()
+
+        for node in candidates:
+            #stops once the tree is small enough
+            if self.node_count <= self.node_limit * 3 // 4:
+                break
+
+            #skips nodes that were in a subtree that has already been pruned
+            if node in pruned:
+                continue
+
+            #marks the subtree (what's left of it) as pruned
+            subtree = list(node.children.values())
+            for child_node in subtree:
+                pruned.add(child_node)
+                subtree.extend(child_node.children.values())
+
+            #collapses the node back into an unexpanded node
+            node.children = {}
+            node.untried_moves = None
+            node.is_fully_expanded = False
+            self.node_count -= len(subtree)
+
     #select best node based on USB1 formula
     def get_best_move(self, node, exploration_constant):
         #define best score & best moves
@@ -156,8 +601,16 @@ class MCTS():
             if child_node.board.player_2 == 'x': current_player = 1
             elif child_node.board.player_2 == 'o': current_player = -1
 
+            #average score of the move
+            move_value = current_player * child_node.score / child_node.visits
+
+            #with RAVE, blends in the all-moves-as-first score (its weight fades as the move gets more real visits)
+            if self.rave and child_node.amaf_visits > 0:
+                beta = math.sqrt(self.rave_equivalence / (3 * child_node.visits + self.rave_equivalence))
+                move_value = (1 - beta) * move_value + beta * current_player * child_node.amaf_score / child_node.amaf_visits
+
             #get move score using UCT formula
-            move_score = current_player * child_node.score / child_node.visits + exploration_constant * math.sqrt(math.log(node.visits)/ child_node.visits)
+            move_score = move_value + exploration_constant * math.sqrt(math.log(node.visits)/ child_node.visits)
 
             #better move has been found
             if move_score > best_score:
@@ -169,4 +622,4 @@ class MCTS():
                 best_moves.append(child_node)
             
         #return one of the best moves randomly
-        return random.choice(best_moves)
\ No newline at end of file
+        return self.random.choice(best_moves)
\ No newline at end of file
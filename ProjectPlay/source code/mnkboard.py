@@ -0,0 +1,340 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# m,n,k board code:                                                                                                      #
+# This is one board that all the games share. A game is set by the number of rows, the number of columns, how many in    #
+# a row are needed to win (k) and whether pieces drop to the bottom of the column (gravity).                             #
+#   TicTacToe       --> 3 x 3,   k = 3, no gravity                                                                       #
+#   Connect4        --> 6 x 7,   k = 4, gravity                                                                          #
+#   Gomoku          --> 15 x 15, k = 5, no gravity                                                                       #
+#   Connect-N       --> any size, any k, gravity                                                                         #
+#                                                                                                                        #
+# Every possible line of k tiles is worked out once per board size (the line tables). When a move is made only the       #
+# lines going through that tile are checked for a win, so checking for a win doesn't get slower on bigger boards.        #
+#                                                                                                                        #
+# The line tables also give a quick static score for a position (evaluate) that cut short rollouts finish with: each     #
+# line that only one player has pieces in counts for that player (more for an open three than an open two in Connect4).  #
+#                                                                                                                        #
+##########################################################################################################################
+
+import math
+
+#what's in a tile, by number (see MNKBoard.cells)
+PIECES = '.xo'
+
+#line tables for each board size, shared by every board of that size
+line_tables = {}
+
+#static evaluation: what a line only one player has pieces in is worth to them, by how many pieces short of k it is
+#(for Connect4 an open three is worth 5 and an open two 1), and the total is squashed into [-1, 1] with tanh(total / scale)
+OPEN_LINE_VALUES = {1: 5, 2: 1}
+EVALUATION_SCALE = 20
+
+#value of an open line with each number of pieces in it (0 to k)
+def get_line_values(k):
+    return [OPEN_LINE_VALUES.get(k - pieces, 0) for pieces in range(k + 1)]
+
+def get_line_tables(rows, columns, k):
+    if (rows, columns, k) not in line_tables:
+        #every line of k tiles on the board (horizontal, vertical and both diagonals)
+        lines = []
+
+        for row in range(rows):
+            for col in range(columns):
+                for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    #checks that the line fits on the board
+                    last_row = row + (k - 1) * row_step
+                    last_col = col + (k - 1) * col_step
+
+                    if 0 <= last_row < rows and 0 <= last_col < columns:
+                        lines.append(tuple((row + i * row_step, col + i * col_step) for i in range(k)))
+
+        #the lines that go through each tile
+        cell_lines = {(row, col): [] for row in range(rows) for col in range(columns)}
+
+        for line in lines:
+            for cell in line:
+                cell_lines[cell].append(line)
+
+        line_tables[rows, columns, k] = (lines, cell_lines)
+
+    return line_tables[rows, columns, k]
+
+#symmetry tables for each board size, shared by every board of that size
+symmetry_tables = {}
+
+def get_symmetry_tables(rows, columns, gravity):
+    if (rows, columns, gravity) not in symmetry_tables:
+        #each symmetry is a function that moves a tile to where it ends up after flipping/rotating the board
+        symmetries = [lambda row, col: (row, col), lambda row, col: (row, columns - 1 - col)]
+
+        #without gravity the board can also be flipped upside down (and turned around)
+        if not gravity:
+            symmetries += [lambda row, col: (rows - 1 - row, col), lambda row, col: (rows - 1 - row, columns - 1 - col)]
+
+            #square boards can also be rotated a quarter turn and flipped along the diagonals
+            if rows == columns:
+                symmetries += [lambda row, col: (col, row), lambda row, col: (columns - 1 - col, rows - 1 - row),
+                               lambda row, col: (col, rows - 1 - row), lambda row, col: (columns - 1 - col, row)]
+
+        #for each symmetry, where each tile goes (forward) and where it came from (back)
+        forward = []
+        back = []
+
+        for symmetry in symmetries:
+            moved = {(row, col): symmetry(row, col) for row in range(rows) for col in range(columns)}
+            forward.append(moved)
+            back.append({new_cell: cell for cell, new_cell in moved.items()})
+
+        #the tiles to read (in row by row order) to get the flipped/rotated board
+        read_orders = [[back_map[row, col] for row in range(rows) for col in range(columns)] for back_map in back]
+
+        symmetry_tables[rows, columns, gravity] = (forward, back, read_orders)
+
+    return symmetry_tables[rows, columns, gravity]
+
+class MNKBoard():
+    def __init__(self, board=None, rows=3, columns=3, k=3, gravity=False):
+        # create a copy of a previous board state if available
+        if board is not None:
+            #the settings and line tables never change so they are shared, only the position is copied
+            self.__dict__.update(board.__dict__)
+            self.position = dict(board.position)
+            self.free_rows = list(board.free_rows)
+            return
+
+        # define players
+        self.player_1 = 'x'
+        self.player_2 = 'o'
+        self.empty_space = '.'
+
+        #the size of the board, how many in a row are needed to win and whether pieces drop down the columns
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.gravity = gravity
+
+        #lines of k tiles (all of them and the ones through each tile)
+        self.lines, self.cell_lines = get_line_tables(rows, columns, k)
+
+        #the ways the board can be flipped/rotated without changing the game
+        self.symmetries, self.symmetries_back, self.symmetry_read_orders = get_symmetry_tables(rows, columns, gravity)
+
+        # define board position
+        self.position = {}
+
+        # reset board
+        self.init_board()
+
+    #when a board is pickled (e.g. sent to another process) the line and symmetry tables are left out, they are
+    #looked up again from the board size when it's unpickled
+    def __getstate__(self):
+        state = dict(self.__dict__)
+
+        for table in ('lines', 'cell_lines', 'symmetries', 'symmetries_back', 'symmetry_read_orders'):
+            del state[table]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lines, self.cell_lines = get_line_tables(self.rows, self.columns, self.k)
+        self.symmetries, self.symmetries_back, self.symmetry_read_orders = get_symmetry_tables(self.rows, self.columns, self.gravity)
+
+    # reset board
+    def init_board(self):
+        for row in range(self.rows):
+            for col in range(self.columns):
+                self.position[row, col] = self.empty_space
+
+        #the next free row in each column (pieces fill columns from the bottom up)
+        self.free_rows = [self.rows - 1] * self.columns
+
+        #number of moves played, the last move made and whether that move won the game
+        self.ply = 0
+        self.last_move = None
+        self.won = False
+
+    #the player whose turn it is
+    @property
+    def current_player(self):
+        return self.player_1
+
+    # make move --> make_move(row, col) or, when there is gravity, make_move(col)
+    def make_move(self, *move):
+        # create new board instance that inherits from the current state
+        board = self.__class__(self)
+
+        #with gravity the piece drops to the next free row of the column
+        if self.gravity:
+            col = move[-1]
+            row = board.free_rows[col]
+
+            if row < 0:
+                raise ValueError('column %d is full' % (col + 1))
+
+            board.free_rows[col] -= 1
+
+        else:
+            row, col = move
+
+        #places player's move in that space
+        board.position[row, col] = board.player_1
+        board.ply += 1
+        board.last_move = (row, col)
+
+        #only the lines through the new piece can have been completed by this move
+        board.won = board.completes_line(row, col)
+
+        # swap players
+        (board.player_1, board.player_2) = (board.player_2, board.player_1)
+
+        # return new board state
+        return board
+
+    #checks if any line through the tile is all the same player
+    def completes_line(self, row, col):
+        player = self.position[row, col]
+
+        for line in self.cell_lines[row, col]:
+            if all(self.position[cell] == player for cell in line):
+                return True
+
+        return False
+
+    # get whether the game is won (by the player who just moved)
+    def is_win(self):
+        return self.won
+
+    # get whether the game is drawn (no empty spaces left)
+    def is_draw(self):
+        return self.ply == self.rows * self.columns
+
+    #quick score for the position from the "x" point of view (1 is a win for "x", -1 for "o"), from the open lines
+    def evaluate(self):
+        if self.won:
+            return 1 if self.player_2 == 'x' else -1
+
+        line_values = get_line_values(self.k)
+        total = 0
+
+        for line in self.lines:
+            pieces = [self.position[cell] for cell in line]
+            x_count = pieces.count('x')
+            o_count = pieces.count('o')
+
+            #a line with both players in it can't be won by either
+            if not o_count:
+                total += line_values[x_count]
+            elif not x_count:
+                total -= line_values[o_count]
+
+        return math.tanh(total / EVALUATION_SCALE)
+
+    #legal moves as the tile the piece would go in
+    def legal_moves(self):
+        if self.gravity:
+            return [(self.free_rows[col], col) for col in range(self.columns) if self.free_rows[col] >= 0]
+
+        return [cell for cell, player in self.position.items() if player == self.empty_space]
+
+    #legal moves that would complete a line for the player (a win if it's their turn, a threat to block if it isn't)
+    def winning_moves(self, player):
+        moves = []
+
+        for move in self.legal_moves():
+            for line in self.cell_lines[move]:
+                if all(self.position[cell] == player for cell in line if cell != move):
+                    moves.append(move)
+                    break
+
+        return moves
+
+    # generate legal moves to play in the current position
+    def generate_states(self):
+        return [self.make_move(*move) for move in self.legal_moves()]
+
+    #the position as one number per tile (row by row): 0 for empty, 1 for "x" and 2 for "o"
+    def cells(self):
+        return bytes(PIECES.index(player) for player in self.position.values())
+
+    #sets the board from one number per tile (see cells). "x" always goes first, so whose turn it is comes from
+    #counting the pieces
+    def load_cells(self, cells):
+        for cell, code in zip(self.position, cells):
+            self.position[cell] = PIECES[code]
+
+        self.ply = sum(1 for code in cells if code)
+        self.last_move = None
+
+        #the next free row in each column (only changes with gravity)
+        if self.gravity:
+            self.free_rows = [max([row for row in range(self.rows) if self.position[row, col] == self.empty_space], default=-1) for col in range(self.columns)]
+
+        if sum(1 for code in cells if code == 1) > self.ply // 2:
+            (self.player_1, self.player_2) = ('o', 'x')
+        else:
+            (self.player_1, self.player_2) = ('x', 'o')
+
+        #checks every line for a win by the player who moved last
+        self.won = any(all(self.position[cell] == self.player_2 for cell in line) for line in self.lines)
+
+        return self
+
+    #the position as a string (row by row)
+    def key(self):
+        return ''.join(self.position.values())
+
+    #the position as it would be after flipping/rotating (whichever gives the smallest string), so all symmetric
+    #positions get the same key. Also returns which symmetry was used so moves can be mapped to and from that position
+    def canonical(self):
+        return min((''.join([self.position[cell] for cell in read_order]), symmetry) for symmetry, read_order in enumerate(self.symmetry_read_orders))
+
+    #moves a tile into the canonical position's frame
+    def to_canonical(self, cell, symmetry):
+        return self.symmetries[symmetry][cell]
+
+    #legal moves, leaving out moves that lead to a flipped/rotated copy of a position an earlier move leads to
+    def unique_moves(self):
+        #the symmetries that leave this board the same (only these can make two different moves equivalent)
+        key = self.key()
+        board_symmetries = [symmetry for symmetry, read_order in enumerate(self.symmetry_read_orders) if ''.join([self.position[cell] for cell in read_order]) == key]
+
+        moves = []
+        equivalent = set()
+
+        for move in self.legal_moves():
+            if move not in equivalent:
+                moves.append(move)
+                equivalent.update(self.symmetries[symmetry][move] for symmetry in board_symmetries)
+
+        return moves
+
+    #moves a tile from the canonical position's frame back onto this board
+    def from_canonical(self, cell, symmetry):
+        return self.symmetries_back[symmetry][cell]
+
+    # print board state
+    def __str__(self):
+        # define board string representation
+        string_of_board = ''
+
+        # loop over board rows
+        for row in range(self.rows):
+            # loop over board columns
+            for col in range(self.columns):
+                string_of_board += ' %s' % self.position[row, col]
+
+            # print new line every row
+            string_of_board += '\n'
+
+        # prepend side to move
+        string_of_board = '\n------------\n "%s" turn:\n-------------\n\n' % self.player_1 + string_of_board
+
+        # return board string
+        return string_of_board
+
+#Gomoku (five in a row on a 15 x 15 board)
+class Gomoku(MNKBoard):
+    def __init__(self, board=None):
+        super().__init__(board, rows=15, columns=15, k=5, gravity=False)
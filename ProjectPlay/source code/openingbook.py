@@ -0,0 +1,171 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Opening book code:                                                                                                     #
+# Every game starts from the same few positions, so instead of searching them again every game this code searches them   #
+# once (offline, with a lot more iterations) and saves the best move for each one to a file. MCTS.search looks the       #
+# position up in the book first and plays the book move straight away if it finds it.                                    #
+#                                                                                                                        #
+# Positions are stored by a hash of their canonical (flipped/rotated) position so symmetric positions share one entry.   #
+# The file is a small header and then fixed size records sorted by hash. It is memory mapped and binary searched, so     #
+# opening it is instant no matter how big the book is.                                                                   #
+#                                                                                                                        #
+# To build a book:  python openingbook.py connect4 --plies 6 --iterations 20000                                          #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import time
+from mcts import MCTS
+
+#file layout: header (magic, version, rows, columns, k, gravity, number of records) then the records sorted by hash
+BOOK_MAGIC = b'PPBK'
+BOOK_VERSION = 1
+HEADER = struct.Struct('<4sHBBBBI')
+
+#each record: position hash, best move (row, col in the canonical frame), visits of that move and its average score
+RECORD = struct.Struct('<QBBIf')
+
+#where the books are kept by default (next to this file)
+BOOK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+#hash of a position's canonical key (the same in every process, unlike Python's hash())
+def position_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+class OpeningBook():
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+
+        #(an empty file can't be memory mapped)
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError('%s is not a version %d opening book' % (path, BOOK_VERSION))
+
+        #reads the header and checks that the file is a book this code can read (and isn't cut short)
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError('%s is not a version %d opening book' % (path, BOOK_VERSION))
+
+        magic, version, self.rows, self.columns, self.k, gravity, self.count = HEADER.unpack_from(self.data, 0)
+        self.gravity = bool(gravity)
+
+        if magic != BOOK_MAGIC or version != BOOK_VERSION or len(self.data) < HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError('%s is not a version %d opening book' % (path, BOOK_VERSION))
+
+    #finds the book move for this board (returns the board after the move, or None if the position isn't in the book)
+    def lookup(self, board):
+        #the book has to be for the same game
+        if (board.rows, board.columns, board.k, board.gravity) != (self.rows, self.columns, self.k, self.gravity):
+            return None
+
+        key, symmetry = board.canonical()
+        target = position_hash(key)
+
+        #binary search over the records (they are sorted by hash)
+        low, high = 0, self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            found, row, col, visits, score = RECORD.unpack_from(self.data, HEADER.size + middle * RECORD.size)
+
+            if found < target:
+                low = middle + 1
+            elif found > target:
+                high = middle
+            else:
+                #maps the move from the canonical position back onto this board
+                row, col = board.from_canonical((row, col), symmetry)
+
+                #makes sure the move is legal (in case of a hash collision)
+                if (row, col) not in board.legal_moves():
+                    return None
+
+                return board.make_move(row, col)
+
+        return None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+#opens a book if there is one (returns None if the file doesn't exist, or is a stale or broken book, so the game
+#just searches every position instead)
+def open_book(path):
+    if os.path.exists(path):
+        try:
+            return OpeningBook(path)
+
+        except (ValueError, OSError):
+            pass
+
+    return None
+
+#default book file for a game
+def book_path(game):
+    return os.path.join(BOOK_FOLDER, '%s.book' % game)
+
+#searches every position in the first plies moves of the game and saves the best move for each to a book
+def build_book(board, plies, iterations, path):
+    #(every book position gets its full search, without the shortcuts for playing quickly)
+    mcts = MCTS(iterations=iterations, symmetry=True, time_management=False)
+    records = {}
+
+    #positions to search at the current ply (one per canonical position)
+    positions = {board.canonical()[0]: board}
+
+    for ply in range(plies):
+        start = time.time()
+        next_positions = {}
+
+        for key, position in positions.items():
+            #nothing to search in finished games
+            if position.is_win() or position.is_draw():
+                continue
+
+            #searches the position and stores the best move in the canonical frame
+            best_move = mcts.search(position)
+            symmetry = position.canonical()[1]
+            row, col = position.to_canonical(best_move.board.last_move, symmetry)
+            records[position_hash(key)] = (row, col, best_move.visits, best_move.score / best_move.visits if best_move.visits else 0)
+
+            #positions for the next ply
+            for state in position.generate_states():
+                next_positions.setdefault(state.canonical()[0], state)
+
+        print('ply %d: %d positions (%.1fs)' % (ply, len(positions), time.time() - start))
+        positions = next_positions
+
+    #writes the book (to a temporary file first so a half written book is never opened)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, board.rows, board.columns, board.k, board.gravity, len(records)))
+
+        for position in sorted(records):
+            file.write(RECORD.pack(position, *records[position]))
+
+    os.replace(path + '.tmp', path)
+
+    return len(records)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build an opening book by searching the first few plies offline')
+    parser.add_argument('game', choices=['connect4', 'tictactoe'])
+    parser.add_argument('--plies', type=int, default=4, help='number of plies from the start to put in the book')
+    parser.add_argument('--iterations', type=int, default=20000, help='MCTS iterations per position')
+    parser.add_argument('--output', help='book file (default: <game>.book next to this file)')
+    args = parser.parse_args()
+
+    if args.game == 'connect4':
+        from connect4 import Board
+    else:
+        from ticktacktoe import Board
+
+    count = build_book(Board(), args.plies, args.iterations, args.output or book_path(args.game))
+    print('saved %d positions' % count)
@@ -0,0 +1,132 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# ProjectPlay command line code:                                                                                         #
+# One entry point for everything in the project:                                                                         #
+#   python projectplay.py play connect4                          --> play against the AI in the terminal                 #
+#   python projectplay.py gui tictactoe                          --> play with the webcam and GUI                        #
+#   python projectplay.py evaluate connect4 --a rave=True        --> play two MCTS agents against each other             #
+#   python projectplay.py bench connect4 --iterations 5000       --> time a search                                       #
+# (or "python -m projectplay ..." from this folder)                                                                      #
+#                                                                                                                        #
+# Each command only imports what it needs when it runs, so the headless commands never load OpenCV or tkinter (only the  #
+# GUI needs them). NumPy and Numba (if they're installed) are only loaded once the AI starts searching, for its random   #
+# numbers and compiled rollout. Add --startup to any command to print how long it took to get ready to run (including    #
+# making its AI).                                                                                                        #
+#                                                                                                                        #
+##########################################################################################################################
+
+import time
+
+#when the program started (for --startup)
+START = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+
+#game --> (game module, GUI module, GUI function)
+GAMES = {
+    'connect4': ('connect4', 'connect4GUI', 'play_Connect4'),
+    'tictactoe': ('ticktacktoe', 'newTicImageGUI', 'play_TicTacToe'),
+}
+
+#big modules that the headless commands shouldn't need
+HEAVY_MODULES = ['cv2', 'numpy', 'tkinter', 'numba']
+
+#board class for a game
+def get_board(game):
+    return importlib.import_module(GAMES[game][0]).Board
+
+#prints how long the command took to get ready and which of the big modules it loaded. The command's AI is made
+#first (from its MCTS settings) so whatever making it costs or loads is counted too
+def report_startup(command, configs=({},)):
+    from evaluate import make_agent
+
+    for config in configs:
+        make_agent(config).close()
+
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print('%s startup: %.1fms (loaded: %s)' % (command, (time.perf_counter() - START) * 1000, ', '.join(loaded) or 'none of %s' % ', '.join(HEAVY_MODULES)))
+
+#plays against the AI in the terminal
+def play(args):
+    board = get_board(args.game)()
+
+    if args.startup:
+        report_startup('play')
+
+    board.game_loop()
+
+#plays with the webcam and GUI
+def gui(args):
+    game_module, gui_module, function = GAMES[args.game]
+    play_gui = getattr(importlib.import_module(gui_module), function)
+
+    if args.startup:
+        report_startup('gui')
+
+    play_gui()
+
+#plays two MCTS agents against each other (see evaluate.py)
+def evaluate(args):
+    from evaluate import evaluate, parse_agent
+    Board = get_board(args.game)
+
+    if args.startup:
+        report_startup('evaluate', [parse_agent(args.a), parse_agent(args.b)])
+
+    evaluate(Board, parse_agent(args.a), parse_agent(args.b), args.games, args.output, args.records)
+
+#times searches from the empty board
+def bench(args):
+    from evaluate import make_agent, parse_agent
+    Board = get_board(args.game)
+
+    config = dict(parse_agent(args.config), iterations=args.iterations)
+
+    if args.startup:
+        report_startup('bench', [config])
+
+    for search in range(args.searches):
+        with make_agent(config) as mcts:
+            start = time.perf_counter()
+            mcts.search(Board())
+            elapsed = time.perf_counter() - start
+
+        print('search %d: %d playouts in %.2fs (%.0f playouts/sec)' % (search + 1, mcts.iteration, elapsed, mcts.iteration / elapsed))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='projectplay', description='ProjectPlay: TicTacToe and Connect4 against MCTS')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('play', help='play against the AI in the terminal')
+    command.set_defaults(run=play)
+
+    command = commands.add_parser('gui', help='play with the webcam and GUI')
+    command.set_defaults(run=gui)
+
+    command = commands.add_parser('evaluate', help='play two MCTS agents against each other')
+    command.add_argument('--games', type=int, default=20)
+    command.add_argument('--a', default='', help='MCTS settings for agent A, e.g. iterations=500,rave=True')
+    command.add_argument('--b', default='', help='MCTS settings for agent B')
+    command.add_argument('--output', help='file to write the results to (one line per game)')
+    command.add_argument('--records', help='game records file to add the games to (see gamerecords.py)')
+    command.set_defaults(run=evaluate)
+
+    command = commands.add_parser('bench', help='time searches from the empty board')
+    command.add_argument('--iterations', type=int, default=5000)
+    command.add_argument('--searches', type=int, default=3)
+    command.add_argument('--config', default='', help='other MCTS settings, e.g. rave=True,seed=1')
+    command.set_defaults(run=bench)
+
+    #options every command has
+    for command in commands.choices.values():
+        command.add_argument('game', choices=list(GAMES))
+        command.add_argument('--startup', action='store_true', help='print how long the command took to get ready')
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Random stream code:                                                                                                    #
+# Each MCTS search owns one of these instead of using the shared "random" module, so a search can be seeded and played   #
+# again exactly (for benchmarks and evaluations) and two searches never pull numbers out of each other's sequence.       #
+#                                                                                                                        #
+# The numbers are drawn in bulk: a NumPy Generator fills a buffer of floats in [0, 1) in one call, and picking one of n  #
+# moves is then just int(buffer[i] * n). Without NumPy the buffer is filled from a random.Random instead. Rollout        #
+# workers each get their own stream, spawned from the search's seed, so they don't repeat each other's numbers and the   #
+# whole search is still the same every time it's run with the same seed. NumPy is only imported when the first numbers   #
+# are drawn, so making a stream (and an MCTS) doesn't load it.                                                           #
+#                                                                                                                        #
+##########################################################################################################################
+
+import random
+
+#how many numbers are drawn at a time
+BUFFER_SIZE = 4096
+
+class RandomStream():
+    #class constructor --> seed: an int, None (seeded from the OS) or a seed spawned from another stream
+    def __init__(self, seed=None, buffer_size=BUFFER_SIZE):
+        self.seed = seed
+        self.buffer_size = buffer_size
+
+        #(made when the first numbers are needed)
+        self.generator = None
+
+        self.buffer = []
+        self.index = 0
+
+    #the generator the numbers come from (made the first time it's needed)
+    def get_generator(self):
+        if self.generator is None:
+            try:
+                import numpy as np
+
+                #(the seed sequence is kept to spawn the workers' seeds from)
+                self.seed_sequence = self.seed if isinstance(self.seed, np.random.SeedSequence) else np.random.SeedSequence(self.seed)
+                self.generator = np.random.default_rng(self.seed_sequence)
+
+            #no NumPy --> falls back to the standard library generator
+            except ImportError:
+                self.generator = random.Random(self.seed)
+
+        return self.generator
+
+    #draws the next buffer of numbers
+    def refill(self):
+        if isinstance(self.get_generator(), random.Random):
+            self.buffer = [self.generator.random() for _ in range(self.buffer_size)]
+
+        else:
+            #(tolist() so each number is read as a plain float instead of a NumPy scalar)
+            self.buffer = self.generator.random(self.buffer_size).tolist()
+
+        self.index = 0
+
+    #next float in [0, 1)
+    def random(self):
+        if self.index == len(self.buffer):
+            self.refill()
+
+        self.index += 1
+        return self.buffer[self.index - 1]
+
+    #random index below n
+    def below(self, n):
+        return int(self.random() * n)
+
+    #random item of a list (IndexError if it's empty, like random.choice)
+    def choice(self, items):
+        return items[self.below(len(items))]
+
+    #non zero 32 bit seed (for the xorshift generator in the rollout kernel)
+    def seed32(self):
+        return self.below(0xFFFFFFFF) + 1
+
+    #seeds for independent streams (e.g. one per worker process)
+    def spawn(self, count):
+        if isinstance(self.get_generator(), random.Random):
+            return [self.generator.getrandbits(64) for _ in range(count)]
+
+        return self.seed_sequence.spawn(count)
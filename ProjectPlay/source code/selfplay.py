@@ -0,0 +1,296 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Distributed self-play code:                                                                                            #
+# Plays lots of games between MCTS agents on as many worker processes (or machines) as there are. The coordinator puts   #
+# one job per game (both agents' settings and a seed) on a job queue, the workers take jobs off it, play them and write  #
+# back the results, and the coordinator collects the results into a game records file (see gamerecords.py).              #
+#                                                                                                                        #
+# The queue is a folder (so workers on other machines just need to see the same folder):                                 #
+#   pending/   jobs waiting to be played       claimed/   jobs being played (a worker moved them here)                   #
+#   results/   one file per finished job       failed/    jobs that went wrong too many times                            #
+#   collected/ jobs whose result has been added to a records file                                                        #
+# A worker claims a job by renaming it into claimed/, which only one worker can do. A job that's been claimed for        #
+# longer than the lease (the worker died or hung) is put back in pending/ to be tried again. Results are written under   #
+# the job's id (to a temporary file first and then renamed), so a job that ends up being played twice still only has     #
+# one result. A job's id comes from its game, agents and seed, so runs with different settings can share a queue without #
+# picking up each other's results, and running the same command again only plays (and records) the games it hasn't       #
+# already. Any other queue works as long as it has the same methods as FileQueue.                                        #
+#                                                                                                                        #
+#   python selfplay.py run connect4 --games 200 --workers 4 --a rave=True --b "" --records selfplay.games                #
+#   python selfplay.py worker selfplay_queue        (to add a worker from another process or machine)                    #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+import uuid
+from gamerecords import GameRecord, append_record, summarize
+
+#board class for each game (imported when needed)
+GAMES = {'connect4': 'connect4', 'tictactoe': 'ticktacktoe'}
+
+class FileQueue():
+    #class constructor --> folder: where the queue is kept, lease: seconds a worker has to finish a job,
+    #                      max_attempts: times a job is tried before it's given up on
+    def __init__(self, folder, lease=600, max_attempts=3):
+        self.folder = folder
+        self.lease = lease
+        self.max_attempts = max_attempts
+
+        for name in ('pending', 'claimed', 'results', 'failed', 'collected'):
+            os.makedirs(os.path.join(folder, name), exist_ok=True)
+
+    def path(self, name, job_id):
+        return os.path.join(self.folder, name, '%s.json' % job_id)
+
+    #writes a file so it appears all at once (to a temporary file first and then renamed)
+    def write(self, path, data):
+        temporary = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+
+        with open(temporary, 'w') as file:
+            json.dump(data, file)
+
+        os.replace(temporary, path)
+
+    #adds a job (a dict with an "id") to the queue
+    def put(self, job):
+        job.setdefault('attempts', 0)
+        self.write(self.path('pending', job['id']), job)
+
+    #takes the next job off the queue (None if there are none waiting)
+    def claim(self):
+        for name in sorted(os.listdir(os.path.join(self.folder, 'pending'))):
+            if not name.endswith('.json'):
+                continue
+
+            claimed = os.path.join(self.folder, 'claimed', name)
+
+            #another worker got to it first --> tries the next one
+            try:
+                os.rename(os.path.join(self.folder, 'pending', name), claimed)
+            except FileNotFoundError:
+                continue
+
+            #already played (it was put back after its lease ran out but the first worker finished it) --> skips it
+            if os.path.exists(os.path.join(self.folder, 'results', name)):
+                os.remove(claimed)
+                continue
+
+            #the lease starts now
+            os.utime(claimed)
+
+            with open(claimed) as file:
+                return json.load(file)
+
+        return None
+
+    #saves a job's result and takes the job off the queue
+    def complete(self, job, result):
+        self.write(self.path('results', job['id']), result)
+
+        try:
+            os.remove(self.path('claimed', job['id']))
+        except FileNotFoundError:
+            pass
+
+    #puts a job that went wrong back on the queue (or in failed/ once it's been tried too many times)
+    def release(self, job):
+        job['attempts'] += 1
+        self.write(self.path('failed' if job['attempts'] >= self.max_attempts else 'pending', job['id']), job)
+
+        try:
+            os.remove(self.path('claimed', job['id']))
+        except FileNotFoundError:
+            pass
+
+    #puts jobs whose lease has run out back on the queue
+    def requeue_expired(self):
+        for name in os.listdir(os.path.join(self.folder, 'claimed')):
+            path = os.path.join(self.folder, 'claimed', name)
+
+            try:
+                if time.time() - os.path.getmtime(path) < self.lease:
+                    continue
+
+                with open(path) as file:
+                    job = json.load(file)
+
+            #(finished in the meantime)
+            except (FileNotFoundError, ValueError):
+                continue
+
+            #a result already came in --> nothing to do again
+            if os.path.exists(self.path('results', job['id'])):
+                os.remove(path)
+            else:
+                self.release(job)
+
+    #ids of the jobs that have a result
+    def finished(self):
+        return {name[:-5] for name in os.listdir(os.path.join(self.folder, 'results')) if name.endswith('.json')}
+
+    #ids of the jobs that were given up on
+    def failed(self):
+        return {name[:-5] for name in os.listdir(os.path.join(self.folder, 'failed')) if name.endswith('.json')}
+
+    def result(self, job_id):
+        with open(self.path('results', job_id)) as file:
+            return json.load(file)
+
+    #marks a job's result as added to the records (so it's never added twice)
+    def mark_collected(self, job_id):
+        self.write(self.path('collected', job_id), {'id': job_id})
+
+    def is_collected(self, job_id):
+        return os.path.exists(self.path('collected', job_id))
+
+#a job's id: its number (so the jobs are played in order) and a hash of what the game is (the game, both agents and the
+#seed), so the same id is never used for a different game
+def get_job_id(number, game, config_x, config_o, seed):
+    settings = json.dumps([game, config_x, config_o, seed], sort_keys=True, default=repr)
+    return 'game-%06d-%s' % (number, hashlib.blake2b(settings.encode(), digest_size=8).hexdigest())
+
+#plays one job --> returns its result (the game as a GameRecord's fields)
+def play_job(job):
+    import importlib
+    from evaluate import make_agent, play_game
+
+    Board = importlib.import_module(GAMES[job['game']]).Board
+    board = Board()
+    moves = []
+
+    #each agent gets its own seed from the job's seed, so a job always plays the same game
+    with make_agent(dict(job['config_x'], seed=job['seed'])) as agent_x, make_agent(dict(job['config_o'], seed=job['seed'] + 1)) as agent_o:
+        winner = play_game(board, agent_x, agent_o, moves)
+
+    return {'id': job['id'], 'rows': board.rows, 'columns': board.columns, 'k': board.k, 'gravity': board.gravity, 'config_x': job['config_x'], 'config_o': job['config_o'], 'result': {'x': 1, 'o': -1, None: 0}[winner], 'moves': moves}
+
+#takes jobs off the queue and plays them until there are none left (or forever, waiting for more, if wait is set)
+def worker(queue, wait=False):
+    while True:
+        job = queue.claim()
+
+        if job is None:
+            if not wait:
+                break
+
+            time.sleep(1)
+            continue
+
+        try:
+            result = play_job(job)
+
+        #anything going wrong --> the job is tried again later
+        except Exception as error:
+            print('job %s failed: %s' % (job['id'], error))
+            queue.release(job)
+            continue
+
+        queue.complete(job, result)
+
+#runs a worker in its own process
+def worker_process(folder, lease):
+    worker(FileQueue(folder, lease))
+
+#puts the games on the queue, plays them on local workers and collects the results into a records file
+def run(game, config_a, config_b, games, workers, folder, records, seed=0, lease=600):
+    queue = FileQueue(folder, lease)
+
+    #one job per game, the agents swap sides every game
+    job_ids = []
+
+    for number in range(games):
+        configs = (config_a, config_b) if number % 2 == 0 else (config_b, config_a)
+        job = {'id': get_job_id(number, game, configs[0], configs[1], seed + 2 * number), 'game': game, 'config_x': configs[0], 'config_o': configs[1], 'seed': seed + 2 * number}
+        job_ids.append(job['id'])
+
+        #(the same games already played or waiting from an earlier run are left alone)
+        if not any(os.path.exists(queue.path(name, job['id'])) for name in ('results', 'pending', 'claimed', 'failed')):
+            queue.put(job)
+
+    #games that already have a result (or failed) from an earlier run, so they aren't counted in the games/sec
+    already_done = (queue.finished() | queue.failed()) & set(job_ids)
+
+    start = time.time()
+    processes = [mp.Process(target=worker_process, args=(folder, lease), daemon=True) for _ in range(workers)]
+
+    for process in processes:
+        process.start()
+
+    #waits for every job to finish (or fail), putting back any whose worker stopped responding
+    while True:
+        done = queue.finished() | queue.failed()
+        print('\r%d/%d games' % (len(done & set(job_ids)), games), end='', flush=True)
+
+        if set(job_ids) <= done:
+            break
+
+        queue.requeue_expired()
+
+        #workers finish when the queue is empty, so any job put back after that gets a new worker
+        if not any(process.is_alive() for process in processes):
+            processes = [mp.Process(target=worker_process, args=(folder, lease), daemon=True)]
+            processes[0].start()
+
+        time.sleep(0.5)
+
+    elapsed = time.time() - start
+    played = len((queue.finished() & set(job_ids)) - already_done)
+
+    if set(job_ids) <= already_done:
+        print('\nall %d games already have results, nothing to play' % games)
+    else:
+        print('\n%d games in %.1fs (%.2f games/sec) on %d workers' % (played, elapsed, played / elapsed, workers))
+
+    for process in processes:
+        process.join()
+
+    #collects the results, in order (each job has one result however many times it was played, and results already
+    #added by an earlier run aren't added again)
+    finished = queue.finished()
+
+    for job_id in job_ids:
+        if job_id in finished and not queue.is_collected(job_id):
+            result = queue.result(job_id)
+            moves = [tuple(move) for move in result['moves']]
+            append_record(records, GameRecord(result['rows'], result['columns'], result['k'], result['gravity'], result['config_x'], result['config_o'], result['result'], moves))
+            queue.mark_collected(job_id)
+
+    return summarize([records])
+
+if __name__ == '__main__':
+    from evaluate import parse_agent
+
+    parser = argparse.ArgumentParser(description='Self-play games between MCTS agents across worker processes')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('run', help='queue the games, play them on local workers and collect the results')
+    command.add_argument('game', choices=list(GAMES))
+    command.add_argument('--games', type=int, default=100)
+    command.add_argument('--workers', type=int, default=os.cpu_count())
+    command.add_argument('--a', default='', help='MCTS settings for agent A, e.g. iterations=500,rave=True')
+    command.add_argument('--b', default='', help='MCTS settings for agent B')
+    command.add_argument('--seed', type=int, default=0)
+    command.add_argument('--queue', default='selfplay_queue', help='queue folder (shared with any other workers)')
+    command.add_argument('--records', default='selfplay.games', help='game records file to add the games to')
+    command.add_argument('--lease', type=float, default=600, help='seconds a worker has to finish a game before it is given to another')
+
+    command = commands.add_parser('worker', help='play games from a queue, waiting for more when it is empty')
+    command.add_argument('queue', help='queue folder')
+    command.add_argument('--lease', type=float, default=600)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        games, agents, think_times = run(args.game, parse_agent(args.a), parse_agent(args.b), args.games, args.workers, args.queue, args.records, args.seed, args.lease)
+
+        for config, stats in sorted(agents.items()):
+            print('%s: win rate %.1f%% (%d wins, %d losses, %d draws)' % (config, 100 * stats['wins'] / stats['games'], stats['wins'], stats['losses'], stats['draws']))
+
+    else:
+        worker(FileQueue(args.queue, args.lease), wait=True)
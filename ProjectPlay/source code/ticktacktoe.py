@@ -11,175 +11,16 @@
 # This code was inspired by this video [REF][3] about implementing MCTS in python and using it in TicTacToe.             #
 ##########################################################################################################################
 
-from copy import deepcopy
-from mcts import *
+from mcts import MCTS
+from mnkboard import MNKBoard
+from openingbook import open_book, book_path
 
 #Board class
-class Board():
+class Board(MNKBoard):
     # create constructor (init board class instance)
     def __init__(self, board=None):
-        # define players
-        self.player_1 = 'x'
-        self.player_2 = 'o'
-        self.empty_space = '.'
-        
-        # define board position
-        self.position = {}
-        
-        # initialize current player
-        self.current_player = self.player_1
-        
-        # reset board
-        self.init_board()
-        
-        # create a copy of a previous board state if available
-        if board is not None:
-            self.__dict__ = deepcopy(board.__dict__)
-    
-    # reset board
-    def init_board(self):
-        # loop over board rows
-        for row in range(3):
-            # loop over board columns
-            for col in range(3):
-                # set every board square to empty space
-                self.position[row, col] = self.empty_space
-    
-    # make move
-    def make_move(self, row, col):
-        # create new board instance that inherits from the current state
-        board = Board(self)
-        
-        # make move
-        board.position[row, col] = board.current_player
-        
-        # swap players
-        (board.player_1, board.player_2) = (board.player_2, board.player_1)
-        board.current_player = board.player_1 if board.current_player == board.player_2 else board.player_2
-        
-        # return new board state
-        return board
-    
-    
-    # get whether the game is won
-    def is_win(self):
-        ##################################
-        # vertical sequence detection
-        ##################################
-        
-        # loop over board columns
-        for col in range(3):
-            # define win sequence list
-            win_sequence = []
-            
-            # loop over board rows
-            for row in range(3):
-                # if found same next element in the row
-                if self.position[row, col] == self.player_2:
-                    # update win sequence
-                    win_sequence.append((row, col))
-                    
-                # if we have 3 elements in the row
-                if len(win_sequence) == 3:
-                    # return the game is won state
-                    return True
-        
-        ##################################
-        # horizontal sequence detection
-        ##################################
-        
-        # loop over board columns
-        for row in range(3):
-            # define win sequence list
-            win_sequence = []
-            
-            # loop over board rows
-            for col in range(3):
-                # if found same next element in the row
-                if self.position[row, col] == self.player_2:
-                    # update win sequence
-                    win_sequence.append((row, col))
-                    
-                # if we have 3 elements in the row
-                if len(win_sequence) == 3:
-                    # return the game is won state
-                    return True
-    
-        ##################################
-        # 1st diagonal sequence detection
-        ##################################
-        
-        # define win sequence list
-        win_sequence = []
-        
-        # loop over board rows
-        for row in range(3):
-            # init column
-            col = row
-        
-            # if found same next element in the row
-            if self.position[row, col] == self.player_2:
-                # update win sequence
-                win_sequence.append((row, col))
-                
-            # if we have 3 elements in the row
-            if len(win_sequence) == 3:
-                # return the game is won state
-                return True
-        
-        ##################################
-        # 2nd diagonal sequence detection
-        ##################################
-        
-        # define win sequence list
-        win_sequence = []
-        
-        # loop over board rows
-        for row in range(3):
-            # init column
-            col = 3 - row - 1
-        
-            # if found same next element in the row
-            if self.position[row, col] == self.player_2:
-                # update win sequence
-                win_sequence.append((row, col))
-                
-            # if we have 3 elements in the row
-            if len(win_sequence) == 3:
-                # return the game is won state
-                return True
-        
-        # by default return non-winning state
-        return False
-    
-    # get whether the game is drawn
-    def is_draw(self):
-        # loop over board squares
-        for row, col in self.position:
-            #if there is an empty space available
-            if self.position[row, col] == self.empty_space:
-                #it's not a draw
-                return False
-        
-        # by default we return a draw
-        return True
-    
-    # generate legal moves to play in the current position
-    def generate_states(self):
-        # define states list (move list - list of available actions to consider)
-        possible_actions = []
-        
-        # loop over board rows
-        for row in range(3):
-            # loop over board columns
-            for col in range(3):
-                # make sure that current square is empty
-                if self.position[row, col] == self.empty_space:
-                    # append available action/board state to action list
-                    possible_actions.append(self.make_move(row, col))
-        
-        # return the list of available actions (board class instances)
-        return possible_actions
+        #TicTacToe is a 3 x 3 board where 3 in a row wins
+        super().__init__(board, rows=3, columns=3, k=3, gravity=False)
     
     # main game loop
     def game_loop(self):
@@ -189,8 +30,8 @@ class Board():
         # print board
         print(self)
         
-        # create MCTS instance
-        mcts = MCTS()
+        # create MCTS instance (using the opening book if one has been built)
+        mcts = MCTS(book=open_book(book_path('tictactoe')))
                 
         # game loop
         while True:
@@ -256,9 +97,9 @@ class Board():
         string_of_board = ''
         
         # loop over board rows
-        for row in range(3):
+        for row in range(self.rows):
             # loop over board columns
-            for col in range(3):
+            for col in range(self.columns):
                 string_of_board += ' %s' % self.position[row, col]
             
             # print new line every row
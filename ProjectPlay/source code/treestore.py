@@ -0,0 +1,296 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Tree store code:                                                                                                       #
+# This code saves an MCTS search tree to a small binary file so the next game (or the next time the program is run) can  #
+# start from what was already learnt instead of searching from nothing. The file's tree starts from the empty board and  #
+# each game's tree is merged into it at its own position (adding the visits and score the game's searches added), so     #
+# games that open differently all add to the same file. The file is kept within the search's node limit (or MAX_NODES)   #
+# by pruning its least visited subtrees before it's written.                                                             #
+#                                                                                                                        #
+# The file is a header (magic, version, board size, MCTS settings that change the shape of the tree and the root         #
+# position) and then one fixed size record per node in depth first order: its move, number of children, the size of its  #
+# subtree (so a whole subtree can be skipped), visits and score. The file is memory mapped when it's loaded and only the #
+# subtree for the current position is turned back into TreeNodes, most visited nodes first, up to the node limit. Files  #
+# from a different version, board size or MCTS settings are rejected.                                                    #
+#                                                                                                                        #
+##########################################################################################################################
+
+import heapq
+import itertools
+import mmap
+import os
+import struct
+
+#file layout: header, root position (one byte per tile) and then the nodes (depth first)
+TREE_MAGIC = b'PPTR'
+TREE_VERSION = 1
+HEADER = struct.Struct('<4sHBBBBBI')
+
+#each node: move (row, col, -1 for the root), number of children, subtree size, visits and score
+NODE = struct.Struct('<bbHIId')
+
+#most nodes a tree file keeps when the search has no node limit of its own
+MAX_NODES = 20000
+
+#where the trees are kept by default (next to this file)
+TREE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+#default tree file for a game
+def tree_path(game):
+    return os.path.join(TREE_FOLDER, '%s.tree' % game)
+
+#saves the tree below root to a file
+def save_tree(root, path, symmetry):
+    #every node (parents before children) and the size of each node's subtree
+    nodes = [root]
+    stack = [root]
+
+    while stack:
+        children = list(stack.pop().children.values())
+        nodes.extend(children)
+        stack.extend(children)
+
+    subtree_size = {}
+    for node in reversed(nodes):
+        subtree_size[node] = 1 + sum(subtree_size[child_node] for child_node in node.children.values())
+
+    board = root.board
+
+    #writes to a temporary file first so a half written tree is never loaded
+    with open(path + '.tmp', 'wb') as file:
+        file.write(HEADER.pack(TREE_MAGIC, TREE_VERSION, board.rows, board.columns, board.k, board.gravity, symmetry, len(nodes)))
+        file.write(board.cells())
+
+        #writes the nodes depth first, so each node's subtree comes straight after it
+        stack = [root]
+
+        while stack:
+            node = stack.pop()
+            row, col = (-1, -1) if node is root else node.board.last_move
+            file.write(NODE.pack(row, col, len(node.children), subtree_size[node], node.visits, node.score))
+
+            #children are pushed in reverse so they come out (and are written) in order
+            stack.extend(reversed(list(node.children.values())))
+
+    os.replace(path + '.tmp', path)
+
+#most nodes a tree file keeps (and loads back): the search's node limit (max_nodes/max_bytes), or MAX_NODES if it
+#has none
+def get_node_limit(mcts, board):
+    limit = mcts.get_node_limit(board)
+    return MAX_NODES if limit is None else limit
+
+#a TreeNode with the visits and score of the node record at an offset
+def read_node(data, offset, board, parent_node):
+    from mcts import TreeNode
+
+    row, col, children, size, visits, score = NODE.unpack_from(data, offset)
+
+    node = TreeNode(board, parent_node)
+    node.visits = visits
+    node.score = score
+
+    return node
+
+#loads the subtree for the given board from a tree file --> returns the subtree's root TreeNode (or None if the
+#position isn't in the tree). Raises ValueError if the file is from a different version, board size or MCTS settings
+def load_tree(path, board, mcts):
+    from mcts import TreeNode
+
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        magic, version, rows, columns, k, gravity, symmetry, count = HEADER.unpack_from(data, 0)
+
+        if magic != TREE_MAGIC or version != TREE_VERSION:
+            raise ValueError('%s is not a version %d tree file' % (path, TREE_VERSION))
+
+        if (rows, columns, k, bool(gravity)) != (board.rows, board.columns, board.k, board.gravity) or bool(symmetry) != mcts.symmetry:
+            raise ValueError('%s was saved for a different game or MCTS settings' % path)
+
+        #the stored root position
+        cell_count = rows * columns
+        root_board = board.__class__(board).load_cells(data[HEADER.size:HEADER.size + cell_count])
+        nodes_offset = HEADER.size + cell_count
+
+        #finds the node for the board below a node (only following moves that are on the board, the same position can
+        #be reached in more than one order) --> returns its offset, or None if it isn't there
+        def find(offset, node_board):
+            if node_board.ply == board.ply:
+                return offset if node_board.key() == board.key() else None
+
+            row, col, children, size, visits, score = NODE.unpack_from(data, offset)
+            child_offset = offset + NODE.size
+
+            for child in range(children):
+                child_row, child_col, _, child_size, _, _ = NODE.unpack_from(data, child_offset)
+
+                #the child's move is on the board --> looks below it
+                if board.position[child_row, child_col] == node_board.player_1:
+                    found = find(child_offset, node_board.make_move(child_row, child_col))
+
+                    if found is not None:
+                        return found
+
+                #skips the child's whole subtree
+                child_offset += child_size * NODE.size
+
+            return None
+
+        offset = find(nodes_offset, root_board) if root_board.ply <= board.ply else None
+
+        if offset is None:
+            return None
+
+        #turns the subtree back into TreeNodes, the most visited nodes first, until there are as many as the tree is
+        #allowed. A node's children are loaded all together or not at all (nodes left without them are like pruned
+        #nodes: they keep their visits and score and are expanded again if the search comes back to them)
+        limit = get_node_limit(mcts, board)
+        root = read_node(data, offset, board.__class__(board), None)
+        count = 1
+        order = itertools.count()
+        queue = [(-root.visits, next(order), offset, root)]
+
+        while queue:
+            _, _, offset, node = heapq.heappop(queue)
+            children = NODE.unpack_from(data, offset)[2]
+
+            if count + children > limit:
+                continue
+
+            child_offset = offset + NODE.size
+
+            for child in range(children):
+                child_row, child_col, child_children, child_size, _, _ = NODE.unpack_from(data, child_offset)
+                child_node = read_node(data, child_offset, node.board.make_move(child_row, child_col), node)
+                node.children[child_row, child_col] = child_node
+
+                if child_children:
+                    heapq.heappush(queue, (-child_node.visits, next(order), child_offset, child_node))
+
+                child_offset += child_size * NODE.size
+
+            count += children
+
+            #moves not in the tree yet are left to expand
+            if not node.is_terminal:
+                node.untried_moves = [move for move in mcts.get_untried_moves(node.board) if move not in node.children]
+                node.is_fully_expanded = not node.untried_moves
+
+        #(the subtree is read straight from the memory mapped file)
+        return root
+
+    finally:
+        data.close()
+
+#the moves from a node's position to a board's position (None if the board can't be reached from it), following the
+#moves already in the tree first
+def find_moves(node, board):
+    from mcts import TreeNode
+
+    if node.board.ply == board.ply:
+        return [] if node.board.key() == board.key() else None
+
+    moves = [move for move in node.board.legal_moves() if board.position[move] == node.board.player_1]
+
+    for move in sorted(moves, key=lambda move: move not in node.children):
+        child_node = node.children.get(move) or TreeNode(node.board.make_move(*move), None)
+        found = find_moves(child_node, board)
+
+        if found is not None:
+            return [move] + found
+
+    return None
+
+#merges a tree into the stored tree's node for the same position: each node adds the visits and score it got since it
+#was loaded from (or last saved to) the file, so nothing is counted twice and every parent still has its children's
+#visits (the stored tree is only used to write the file)
+def merge_nodes(stored, node, saved_stats):
+    from mcts import TreeNode
+
+    visits, score = saved_stats.get(node, (0, 0))
+    stored.visits += node.visits - visits
+    stored.score += node.score - score
+
+    for move, child_node in node.children.items():
+        if move not in stored.children:
+            stored.children[move] = TreeNode(child_node.board, stored)
+
+        merge_nodes(stored.children[move], child_node, saved_stats)
+
+#prunes the least visited subtrees of a tree until it has no more than limit nodes (like MCTS.prune, the pruned nodes
+#keep their visits and score but lose their children)
+def prune_tree(root, limit):
+    nodes = [root]
+    for node in nodes:
+        nodes.extend(node.children.values())
+
+    count = len(nodes)
+    pruned = set()
+
+    for node in sorted((node for node in nodes if node.children and node is not root), key=lambda node: node.visits):
+        if count <= limit:
+            break
+
+        if node in pruned:
+            continue
+
+        subtree = list(node.children.values())
+        for child_node in subtree:
+            pruned.add(child_node)
+            subtree.extend(child_node.children.values())
+
+        node.children = {}
+        count -= len(subtree)
+
+#adds a tree to a tree file. The file's tree starts from the empty board, so trees from games that opened differently
+#all fit in it: the tree goes in at its position (made if it isn't in the file yet) and the nodes above it get the
+#visits and score it adds. The file is kept within the search's node limit by pruning the least visited subtrees. A
+#stale or broken file is started again. saved_stats is the visits and score each node already had in the file (by
+#node, nodes not in it had none)
+def merge_tree(root, path, mcts, saved_stats):
+    from mcts import TreeNode
+
+    board = root.board
+    empty_board = board.__class__(board).load_cells(bytes(board.rows * board.columns))
+    stored = None
+
+    if os.path.exists(path):
+        try:
+            stored = load_tree(path, empty_board, mcts)
+
+        except (ValueError, OSError, struct.error):
+            stored = None
+
+    if stored is None:
+        stored = TreeNode(empty_board, None)
+
+    moves = find_moves(stored, board)
+
+    if moves is None:
+        return
+
+    #finds (or makes) the stored node for the tree's position
+    node = stored
+    for move in moves:
+        if move not in node.children:
+            node.children[move] = TreeNode(node.board.make_move(*move), node)
+
+        node = node.children[move]
+
+    visits, score = saved_stats.get(root, (0, 0))
+    extra_visits = root.visits - visits
+    extra_score = root.score - score
+    merge_nodes(node, root, saved_stats)
+
+    node = node.parent_node
+
+    while node is not None:
+        node.visits += extra_visits
+        node.score += extra_score
+        node = node.parent_node
+
+    prune_tree(stored, get_node_limit(mcts, empty_board))
+    save_tree(stored, path, mcts.symmetry)
@@ -0,0 +1,178 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Value network code:                                                                                                    #
+# Instead of playing a random game out from every new leaf, MCTS can ask a small neural network how good the position    #
+# is. The network is a NumPy multilayer perceptron: the board goes in as two planes (one for the "x" pieces and one for  #
+# the "o" pieces), then a hidden layer, and out comes a score between -1 ("o" wins) and 1 ("x" wins), the same as a      #
+# rollout. MCTS collects a batch of leaves (with virtual visits, like the leaf parallel search) and the whole batch is   #
+# scored with one matrix multiply per layer.                                                                             #
+#                                                                                                                        #
+# The network is trained offline from self-play games (each position is labelled with how the game ended):               #
+#   python valuenet.py connect4 --games 400 --iterations 300                                                             #
+# and then used with MCTS(evaluator=open_value_net(value_path('connect4'))), which the GUIs do whenever the game's       #
+# network file is there (evaluate.py and projectplay.py load one with the value_net="file.npz" agent setting).           #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import os
+import time
+import numpy as np
+
+#where the networks are kept by default (next to this file)
+VALUE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+#default network file for a game
+def value_path(game):
+    return os.path.join(VALUE_FOLDER, '%s.value.npz' % game)
+
+#opens a network if there is one (returns None if the file doesn't exist)
+def open_value_net(path):
+    if os.path.exists(path):
+        return ValueNet.load(path)
+
+    return None
+
+class ValueNet():
+    #class constructor --> rows, columns: board size, hidden: size of the hidden layer
+    def __init__(self, rows, columns, hidden=64, seed=None):
+        self.rows = rows
+        self.columns = columns
+
+        #small random starting weights
+        generator = np.random.default_rng(seed)
+        inputs = 2 * rows * columns
+        self.w1 = generator.normal(0, 1 / np.sqrt(inputs), (inputs, hidden))
+        self.b1 = np.zeros(hidden)
+        self.w2 = generator.normal(0, 1 / np.sqrt(hidden), (hidden, 1))
+        self.b2 = np.zeros(1)
+
+    #checks the network was trained for boards of this size
+    def fits(self, board):
+        return (self.rows, self.columns) == (board.rows, board.columns)
+
+    #the boards as network inputs: one row per board, the "x" plane and then the "o" plane
+    def features(self, boards):
+        cells = np.frombuffer(b''.join(board.cells() for board in boards), dtype=np.uint8).reshape(len(boards), -1)
+        return np.concatenate([cells == 1, cells == 2], axis=1).astype(np.float64)
+
+    #runs the network --> returns the hidden layer and the scores
+    def forward(self, features):
+        hidden = np.tanh(features @ self.w1 + self.b1)
+        return hidden, np.tanh(hidden @ self.w2 + self.b2)[:, 0]
+
+    #scores a batch of boards from the "x" point of view (finished games get their real result)
+    def evaluate(self, boards):
+        scores = self.forward(self.features(boards))[1].tolist()
+
+        for index, board in enumerate(boards):
+            if board.is_win():
+                scores[index] = 1 if board.player_2 == 'x' else -1
+            elif board.is_draw():
+                scores[index] = 0
+
+        return scores
+
+    #trains the network on boards and their results (mean squared error with Adam), mirrored boards are added since
+    #a left/right flip doesn't change who is winning
+    def train(self, boards, results, epochs=30, batch_size=256, learning_rate=0.003, seed=None):
+        features = self.features(boards)
+        mirrored = features.reshape(-1, 2, self.rows, self.columns)[:, :, :, ::-1].reshape(len(boards), -1)
+        features = np.concatenate([features, mirrored])
+        targets = np.concatenate([results, results]).astype(np.float64)
+
+        generator = np.random.default_rng(seed)
+        weights = [self.w1, self.b1, self.w2, self.b2]
+        moments = [np.zeros_like(weight) for weight in weights]
+        velocities = [np.zeros_like(weight) for weight in weights]
+        step = 0
+
+        for epoch in range(epochs):
+            order = generator.permutation(len(features))
+
+            for first in range(0, len(order), batch_size):
+                batch = order[first:first + batch_size]
+                hidden, scores = self.forward(features[batch])
+
+                #gradients of the mean squared error back through both layers
+                error = 2 * (scores - targets[batch]) * (1 - scores ** 2) / len(batch)
+                hidden_error = np.outer(error, self.w2[:, 0]) * (1 - hidden ** 2)
+                gradients = [features[batch].T @ hidden_error, hidden_error.sum(0), hidden.T @ error[:, None], error.sum(keepdims=True)]
+
+                #Adam update (changes the weights in place)
+                step += 1
+                for weight, gradient, moment, velocity in zip(weights, gradients, moments, velocities):
+                    moment[:] = 0.9 * moment + 0.1 * gradient
+                    velocity[:] = 0.999 * velocity + 0.001 * gradient ** 2
+                    weight -= learning_rate * (moment / (1 - 0.9 ** step)) / (np.sqrt(velocity / (1 - 0.999 ** step)) + 1e-8)
+
+        #final training error
+        return float(np.mean((self.forward(features)[1] - targets) ** 2))
+
+    def save(self, path):
+        #(the file name has to end in .npz or NumPy adds it)
+        np.savez(path, rows=self.rows, columns=self.columns, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            net = cls(int(data['rows']), int(data['columns']), hidden=data['w1'].shape[1])
+            net.w1, net.b1, net.w2, net.b2 = data['w1'], data['b1'], data['w2'], data['b2']
+
+        return net
+
+#plays MCTS against itself --> returns every position that came up and how each game ended (from the "x" point of
+#view). The first few moves of each game are random so the games don't all look the same
+def self_play(new_board, games, iterations, random_plies=4, seed=None):
+    from mcts import MCTS
+
+    boards = []
+    results = []
+
+    for game in range(games):
+        mcts = MCTS(iterations=iterations, seed=None if seed is None else seed + game)
+        board = new_board()
+        positions = []
+
+        while not board.is_win() and not board.is_draw():
+            if board.ply < random_plies:
+                board = board.make_move(*mcts.random.choice(board.legal_moves()))
+            else:
+                board = mcts.search(board).board
+
+            if not board.is_win() and not board.is_draw():
+                positions.append(board)
+
+        result = (1 if board.player_2 == 'x' else -1) if board.is_win() else 0
+        boards.extend(positions)
+        results.extend([result] * len(positions))
+
+        print('game %d: %s, %d positions' % (game + 1, {1: 'x wins', -1: 'o wins', 0: 'draw'}[result], len(positions)))
+
+    return boards, np.array(results)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train a value network from self-play games')
+    parser.add_argument('game', choices=['connect4', 'tictactoe'])
+    parser.add_argument('--games', type=int, default=400, help='number of self-play games')
+    parser.add_argument('--iterations', type=int, default=300, help='MCTS iterations per move in the self-play games')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--hidden', type=int, default=64, help='size of the hidden layer')
+    parser.add_argument('--seed', type=int, help='seed for the games and training (for repeatable runs)')
+    parser.add_argument('--output', help='network file (default: <game>.value.npz next to this file)')
+    args = parser.parse_args()
+
+    if args.game == 'connect4':
+        from connect4 import Board
+    else:
+        from ticktacktoe import Board
+
+    start = time.time()
+    boards, results = self_play(Board, args.games, args.iterations, seed=args.seed)
+    print('%d positions from %d games in %.1fs' % (len(boards), args.games, time.time() - start))
+
+    net = ValueNet(Board().rows, Board().columns, args.hidden, args.seed)
+    print('training error: %.3f' % net.train(boards, results, args.epochs, seed=args.seed))
+
+    net.save(args.output or value_path(args.game))
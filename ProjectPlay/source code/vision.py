@@ -0,0 +1,279 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Vision code:                                                                                                           #
+# The image processing that both GUIs use to find the player's move, in one place. Every pixel of the webcam image is    #
+# classified as red (the board), green (the player's marker) or other, and the tile (or column for Connect4) with the    #
+# most green in it is the player's move.                                                                                 #
+#                                                                                                                        #
+# The colours aren't worked out from HSV every frame. Instead every colour is sorted into green (marker), red (board) or #
+# other once, ahead of time, into a colour table: 32 levels of each of blue, green and red (32 x 32 x 32 entries).       #
+# Classifying a frame is then just looking up each pixel in the table (in one compiled pass over the image if Numba is   #
+# installed, otherwise with NumPy). The table starts off from the HSV ranges below and can be calibrated from a few      #
+# frames of the real board under the real lighting: the marker and board are found with looser ranges (keeping only big  #
+# patches, not specks) and the colours in them are voted into the table. A calibrated table is saved next to this file   #
+# (colours.npy) and used from then on.                                                                                   #
+#   python vision.py calibrate --camera 0 --frames 10                                                                    #
+#                                                                                                                        #
+# A BoardDetector keeps all of its images (the table indexes, classes, masks and filtered image) and writes into them    #
+# every frame instead of making new ones, so watching a webcam doesn't keep allocating memory. It needs one detector per #
+# thread since the images are reused.                                                                                    #
+#                                                                                                                        #
+# [REF]                                                                                                                  #
+#   [6]	"Finding red color in image using Python & OpenCV," Stack Overflow.                                              #
+#       https://stackoverflow.com/a/55236890 (accessed Mar. 25, 2024).                                                   #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import os
+import numpy as np
+import cv2
+
+# [REF][6]
+#HSV ranges for the red of the board (red wraps around, so it's two ranges: 0 - 10 and 160 - 180)
+RED_RANGES = [
+    (np.array([0, 100, 20]), np.array([10, 255, 255])),
+    (np.array([160, 100, 20]), np.array([179, 255, 255])),
+]
+
+#HSV range for the green of the player's marker
+GREEN_RANGE = (np.array([40, 40, 40]), np.array([80, 255, 255]))
+
+#looser ranges used to find the board and marker in calibration frames (dimmer and less saturated colours allowed)
+CALIBRATION_RED_RANGES = [
+    (np.array([0, 60, 15]), np.array([12, 255, 255])),
+    (np.array([155, 60, 15]), np.array([179, 255, 255])),
+]
+CALIBRATION_GREEN_RANGE = (np.array([35, 25, 25]), np.array([90, 255, 255]))
+
+#smallest patch (fraction of the frame) that counts as part of the board or marker when calibrating
+CALIBRATION_MIN_AREA = 0.002
+
+#what each colour is classified as
+OTHER, RED, GREEN = 0, 1, 2
+
+#the colour table has 2^COLOUR_BITS levels of each of blue, green and red
+COLOUR_BITS = 5
+COLOUR_SHIFT = 8 - COLOUR_BITS
+
+#what each (quantized) blue, green and red level is multiplied by to make a pixel's table index
+COLOUR_WEIGHTS = np.array([[1 << 2 * COLOUR_BITS, 1 << COLOUR_BITS, 1]], dtype=np.float32)
+
+#where the calibrated colour table is kept by default (next to this file)
+COLOUR_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colours.npy')
+
+#colour tables already loaded (by file)
+colour_tables = {}
+
+#the compiled classify kernel (loaded the first time it's needed, since importing Numba is slow)
+kernel = None
+loaded = False
+
+#looks up the class of every pixel of a BGR image in the colour table, written into classes
+def classify_kernel(image, table, classes):
+    height, width = classes.shape
+
+    for row in range(height):
+        for col in range(width):
+            blue = image[row, col, 0] >> COLOUR_SHIFT
+            green = image[row, col, 1] >> COLOUR_SHIFT
+            red = image[row, col, 2] >> COLOUR_SHIFT
+            classes[row, col] = table[(blue << 2 * COLOUR_BITS) | (green << COLOUR_BITS) | red]
+
+#compiles the kernel if Numba is installed (returns False if it isn't)
+def kernel_available():
+    global kernel, loaded
+
+    if not loaded:
+        loaded = True
+
+        try:
+            from numba import njit
+            kernel = njit(cache=True)(classify_kernel)
+
+        except ImportError:
+            kernel = None
+
+    return kernel is not None
+
+#the table index of every pixel (blue, green and red levels packed into one number) --> quantized, levels: uint8 and
+#uint16 images the levels are worked out in, index: uint16 image the indexes are written into
+def get_colour_index(image, quantized, levels, index):
+    np.right_shift(image, COLOUR_SHIFT, out=quantized)
+    np.copyto(levels, quantized)
+    cv2.transform(levels, COLOUR_WEIGHTS, dst=index)
+
+    return index
+
+#masks of the pixels in an HSV image that are in any of the ranges
+def get_range_mask(hsv, ranges):
+    mask = cv2.inRange(hsv, ranges[0][0], ranges[0][1])
+
+    for lowerbound, upperbound in ranges[1:]:
+        mask |= cv2.inRange(hsv, lowerbound, upperbound)
+
+    return mask
+
+#the colour table from the HSV ranges (each entry is the class of the colour in the middle of its level)
+def build_colour_table():
+    levels = (np.arange(1 << COLOUR_BITS, dtype=np.uint16) << COLOUR_SHIFT) + (1 << COLOUR_SHIFT >> 1)
+    blue, green, red = np.meshgrid(levels, levels, levels, indexing='ij')
+    colours = np.stack([blue, green, red], axis=-1).reshape(1, -1, 3).astype(np.uint8)
+    hsv = cv2.cvtColor(colours, cv2.COLOR_BGR2HSV)
+
+    table = np.full(colours.shape[1], OTHER, dtype=np.uint8)
+    table[get_range_mask(hsv, RED_RANGES)[0] > 0] = RED
+    table[get_range_mask(hsv, [GREEN_RANGE])[0] > 0] = GREEN
+
+    return table
+
+#the saved colour table if there is one, otherwise the one from the HSV ranges
+def get_colour_table(path=COLOUR_TABLE_PATH):
+    if path not in colour_tables:
+        colour_tables[path] = np.load(path) if os.path.exists(path) else build_colour_table()
+
+    return colour_tables[path]
+
+#only keeps the patches of a mask that are big enough (drops specks of colour in the background)
+def keep_big_patches(mask, min_area):
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    big = np.zeros(count, dtype=bool)
+    big[1:] = stats[1:, cv2.CC_STAT_AREA] >= min_area
+
+    return big[labels]
+
+#calibrates the colour table from frames of the real board (with the marker on it) --> returns the new table
+#   colours seen in the frames are voted for by class (with each vote also going to the neighbouring levels so close
+#   colours are covered too), colours never seen keep their class from the starting table
+def calibrate_colour_table(frames, table=None):
+    table = (build_colour_table() if table is None else table).copy()
+    size = 1 << COLOUR_BITS
+    votes = np.zeros((3, size ** 3))
+
+    for frame in frames:
+        index = get_colour_index(frame, np.empty_like(frame), frame.astype(np.uint16), np.empty(frame.shape[:2], dtype=np.uint16)).ravel()
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        min_area = CALIBRATION_MIN_AREA * frame.shape[0] * frame.shape[1]
+
+        #each pixel's class: the big patches of (loose) red and green, everything else is other
+        labels = np.full(index.shape, OTHER, dtype=np.uint8)
+        labels[keep_big_patches(get_range_mask(hsv, CALIBRATION_RED_RANGES), min_area).ravel()] = RED
+        labels[keep_big_patches(get_range_mask(hsv, [CALIBRATION_GREEN_RANGE]), min_area).ravel()] = GREEN
+
+        for colour_class in (OTHER, RED, GREEN):
+            votes[colour_class] += np.bincount(index[labels == colour_class], minlength=size ** 3)
+
+    #spreads the votes to the neighbouring levels (3 x 3 x 3 box)
+    votes = votes.reshape(3, size, size, size)
+    padded = np.pad(votes, ((0, 0), (1, 1), (1, 1), (1, 1)))
+    spread = sum(padded[:, i:i + size, j:j + size, k:k + size] for i in range(3) for j in range(3) for k in range(3)).reshape(3, -1)
+
+    #colours with votes get the class with the most votes
+    seen = spread.sum(axis=0) > 0
+    table[seen] = spread[:, seen].argmax(axis=0)
+
+    return table
+
+#calibrates from frames and saves the table (the new table is used straight away by detectors using that file)
+def save_calibration(frames, path=COLOUR_TABLE_PATH):
+    table = calibrate_colour_table(frames)
+    np.save(path, table)
+    colour_tables[path] = table
+
+    return table
+
+class BoardDetector():
+    #class constructor --> rows, columns: the grid the image is split into, columns_only: only the column matters
+    #                      (Connect4, the marker can be anywhere in the column), colour_table_path: the colour table file
+    def __init__(self, rows, columns, columns_only=False, colour_table_path=COLOUR_TABLE_PATH):
+        self.rows = rows
+        self.columns = columns
+        self.columns_only = columns_only
+        self.colour_table_path = colour_table_path
+
+        #images reused every frame (made for the first frame, and again if the frame size changes)
+        self.shape = None
+
+    #makes the images for frames of this size
+    def allocate(self, shape):
+        height, width = shape[:2]
+        self.shape = shape
+
+        #(only needed without the kernel)
+        if not kernel_available():
+            self.quantized = np.empty((height, width, 3), dtype=np.uint8)
+            self.levels = np.empty((height, width, 3), dtype=np.uint16)
+            self.index = np.empty((height, width), dtype=np.uint16)
+
+        self.classes = np.empty((height, width), dtype=np.uint8)
+        self.green_mask = np.empty((height, width), dtype=bool)
+        self.combined_mask = np.empty((height, width), dtype=bool)
+        self.filtered = np.empty((height, width, 3), dtype=np.uint8)
+
+    #finds the player's move in a BGR image --> returns the tile (row, col), or (0, col) with columns_only, with the
+    #most green in it (None if there's no green). The filtered image (red and green only) is left in self.filtered
+    def detect(self, image):
+        if self.shape != image.shape:
+            self.allocate(image.shape)
+
+        #looks up the class of every pixel in the colour table
+        table = get_colour_table(self.colour_table_path)
+
+        if kernel_available():
+            kernel(image, table, self.classes)
+        else:
+            get_colour_index(image, self.quantized, self.levels, self.index)
+            np.take(table, self.index, out=self.classes, mode='clip')
+
+        #green mask, and red or green mask
+        np.equal(self.classes, GREEN, out=self.green_mask)
+        np.not_equal(self.classes, OTHER, out=self.combined_mask)
+
+        #the image with only the red and green left in it (for troubleshooting)
+        self.filtered[:] = 0
+        cv2.bitwise_or(image, image, dst=self.filtered, mask=self.combined_mask.view(np.uint8))
+
+        return self.find_move(self.green_mask.view(np.uint8))
+
+    #the grid region with the most of the mask in it
+    def find_move(self, mask):
+        height, width = mask.shape
+        grid_height = height if self.columns_only else height // self.rows
+        grid_width = width // self.columns
+
+        most = 0
+        move = None
+
+        for row in range(1 if self.columns_only else self.rows):
+            for col in range(self.columns):
+                count = cv2.countNonZero(mask[row * grid_height:(row + 1) * grid_height, col * grid_width:(col + 1) * grid_width])
+
+                if count > most:
+                    most = count
+                    move = (row, col)
+
+        return move
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calibrate the colour table from frames of the real board (with the green marker on it)')
+    parser.add_argument('command', choices=['calibrate'])
+    parser.add_argument('--camera', type=int, default=0, help='webcam to take the frames from')
+    parser.add_argument('--frames', type=int, default=10, help='number of frames to take')
+    parser.add_argument('--images', nargs='+', help='image files to use instead of the webcam')
+    parser.add_argument('--output', default=COLOUR_TABLE_PATH, help='colour table file')
+    args = parser.parse_args()
+
+    if args.images:
+        frames = [cv2.imread(path) for path in args.images]
+
+    else:
+        capture = cv2.VideoCapture(args.camera)
+        frames = [frame for ok, frame in (capture.read() for _ in range(args.frames)) if ok]
+        capture.release()
+
+    if not frames or any(frame is None for frame in frames):
+        parser.error('could not read the frames')
+
+    table = save_calibration(frames, args.output)
+    print('calibrated from %d frames: %d colours green, %d red' % (len(frames), np.count_nonzero(table == GREEN), np.count_nonzero(table == RED)))
@@ -0,0 +1,254 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Vision service code:                                                                                                   #
+# Watches lots of boards at once from one process, e.g. a room of tables each with its own webcam. Every video source    #
+# (a webcam number or a video file) has its own game: when the player's green marker has been seen on the same legal     #
+# tile for a few frames in a row, that's their move, and the AI replies.                                                 #
+#                                                                                                                        #
+# The frames are processed on a small pool of threads (OpenCV lets go of the GIL while it works on an image, so the      #
+# threads really do run at the same time). Each source is only looked at up to its own frame rate and never by two       #
+# threads at once, so the CPU used is bounded by the number of threads and the frame rates. Each source reads its frames #
+# into the same image every time, and each thread has one BoardDetector per game that it reuses, so the memory doesn't   #
+# grow while it runs. The AI's searches (pure Python, so they hold the GIL) run in a separate pool of processes with a   #
+# time limit, so one table's AI thinking never holds up the frames of the others. All the detectors use the same colour  #
+# table (calibrate it for the room's lighting first with python vision.py calibrate, see vision.py).                     #
+#                                                                                                                        #
+#   python visionservice.py --source 0:connect4 --source 1:tictactoe --source table3.mp4:connect4 --workers 4            #
+#                                                                                                                        #
+##########################################################################################################################
+
+import argparse
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import cv2
+from vision import BoardDetector
+from gameserver import search_move
+
+#game --> (board module, detector settings)
+GAMES = {
+    'connect4': ('connect4', (6, 7, True)),
+    'tictactoe': ('ticktacktoe', (3, 3, False)),
+}
+
+#how many frames in a row the marker has to be on the same tile before it counts as a move
+STABLE_FRAMES = 3
+
+#most seconds the AI thinks about a move, and the least it can be given (with less it hardly looks at any moves)
+SEARCH_TIME = 1.0
+MIN_SEARCH_TIME = 0.01
+
+class Source():
+    #class constructor --> name: what the source is called in the output, capture: anything with read() like
+    #                      cv2.VideoCapture, frame_rate: most frames a second to look at, mcts_config: MCTS settings for
+    #                      the AI (its searches are stopped after SEARCH_TIME seconds unless it has its own time_limit,
+    #                      which is never less than MIN_SEARCH_TIME)
+    def __init__(self, name, capture, game, frame_rate=5, mcts_config=None):
+        import importlib
+
+        self.name = name
+        self.capture = capture
+        self.game = game
+        self.frame_interval = 1 / frame_rate
+
+        #the source's game
+        self.board = importlib.import_module(GAMES[game][0]).Board()
+        self.mcts_config = dict(mcts_config or {})
+        self.mcts_config.setdefault('time_limit', SEARCH_TIME)
+
+        if self.mcts_config['time_limit'] is not None:
+            self.mcts_config['time_limit'] = max(self.mcts_config['time_limit'], MIN_SEARCH_TIME)
+
+        #the AI's search while it's thinking (a future from the search pool)
+        self.search = None
+
+        #image the frames are read into (reused every frame once the first frame has been read)
+        self.frame = None
+
+        #when the next frame is due, and whether a thread is working on this source now
+        self.next_frame = 0
+        self.busy = False
+        self.finished = False
+
+        #tile the marker has been seen on and for how many frames in a row (and the last tile that was played)
+        self.seen = None
+        self.seen_frames = 0
+        self.played = None
+
+        self.frames = 0
+
+    #checks the tile is a move the player can make (with gravity only the column matters)
+    def is_legal(self, move):
+        if self.board.is_win() or self.board.is_draw():
+            return False
+
+        if self.board.gravity:
+            return move[1] in [col for row, col in self.board.legal_moves()]
+
+        return move in self.board.legal_moves()
+
+    #the end of the game (if it's over)
+    def get_result(self):
+        if self.board.is_win():
+            return ['%s: player "%s" wins' % (self.name, self.board.player_2)]
+        elif self.board.is_draw():
+            return ['%s: draw' % self.name]
+
+        return []
+
+    #looks at one frame (the player's moves are sent to the search pool for the AI's reply) --> returns what happened
+    #(a list of lines to print)
+    def process(self, detector, search_pool):
+        ok, frame = self.capture.read(self.frame)
+
+        if not ok:
+            self.finished = True
+            return ['%s: no more frames' % self.name]
+
+        self.frame = frame
+        self.frames += 1
+
+        #the AI is still thinking --> the frame is only read (so the video doesn't fall behind)
+        if self.search is not None:
+            if not self.search.done():
+                return []
+
+            move, playouts = self.search.result()
+            self.search = None
+            self.board = self.board.make_move(*move)
+
+            return ['%s: AI "%s" plays %s' % (self.name, self.board.player_2, move[1] if self.board.gravity else move)] + self.get_result()
+
+        move = detector.detect(frame)
+
+        #the marker was taken off the board --> the same tile (or column) can be played again
+        if move is None:
+            self.played = None
+
+        #the marker has to stay on the same tile for a few frames so a hand moving over the board isn't a move
+        if move is not None and move == self.seen:
+            self.seen_frames += 1
+        else:
+            self.seen = move
+            self.seen_frames = 1
+
+        if move is None or move == self.played or self.seen_frames < STABLE_FRAMES or not self.is_legal(move):
+            return []
+
+        #the player's move and the AI's reply
+        self.played = move
+        self.board = self.board.make_move(*move)
+        events = ['%s: player "%s" plays %s' % (self.name, self.board.player_2, move[1] if self.board.gravity else move)]
+
+        if not self.board.is_win() and not self.board.is_draw():
+            self.search = search_pool.submit(search_move, self.board, self.mcts_config)
+
+        return events + self.get_result()
+
+class VisionService():
+    #class constructor --> workers: threads processing frames, search_workers: processes running the AI's searches
+    def __init__(self, workers=4, search_workers=2):
+        self.pool = ThreadPoolExecutor(workers)
+
+        #(the search processes are started fresh instead of forked, since forking while the frame threads are running
+        #can leave a child stuck on a lock one of them was holding)
+        self.search_pool = ProcessPoolExecutor(search_workers, mp_context=mp.get_context('spawn'))
+        self.sources = []
+        self.lock = threading.Lock()
+
+        #each thread keeps its own detectors (their images are reused, so they can't be shared between threads)
+        self.local = threading.local()
+
+    def add_source(self, source):
+        self.sources.append(source)
+
+    #the calling thread's detector for a game
+    def get_detector(self, game):
+        if not hasattr(self.local, 'detectors'):
+            self.local.detectors = {}
+
+        if game not in self.local.detectors:
+            self.local.detectors[game] = BoardDetector(*GAMES[game][1])
+
+        return self.local.detectors[game]
+
+    #runs in the pool: processes one frame of a source and prints what happened
+    def work(self, source):
+        try:
+            for event in source.process(self.get_detector(source.game), self.search_pool):
+                print(event)
+
+        except Exception as error:
+            print('%s: %s' % (source.name, error))
+            source.finished = True
+
+        finally:
+            with self.lock:
+                source.busy = False
+
+    #hands out frames to the pool until every source has finished (or the time is up)
+    def run(self, duration=None):
+        start = time.perf_counter()
+
+        while any(not source.finished for source in self.sources):
+            if duration is not None and time.perf_counter() - start > duration:
+                break
+
+            now = time.perf_counter()
+            next_due = now + 0.1
+
+            for source in self.sources:
+                with self.lock:
+                    if source.finished or source.busy:
+                        continue
+
+                    #not due yet
+                    if now < source.next_frame:
+                        next_due = min(next_due, source.next_frame)
+                        continue
+
+                    source.busy = True
+                    source.next_frame = max(source.next_frame + source.frame_interval, now)
+
+                self.pool.submit(self.work, source)
+
+            #sleeps until the next frame is due
+            time.sleep(max(0, next_due - time.perf_counter()))
+
+        self.pool.shutdown()
+        self.search_pool.shutdown(cancel_futures=True)
+        elapsed = time.perf_counter() - start
+
+        for source in self.sources:
+            print('%s: %d frames (%.1f fps)' % (source.name, source.frames, source.frames / elapsed))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Watch several boards (webcams or video files) at once')
+    parser.add_argument('--source', action='append', required=True, help='<webcam number or video file>:<connect4|tictactoe>')
+    parser.add_argument('--workers', type=int, default=4, help='number of threads processing frames')
+    parser.add_argument('--fps', type=float, default=5, help='most frames a second looked at for each source')
+    parser.add_argument('--search-workers', type=int, default=2, help='number of processes running the AI searches')
+    parser.add_argument('--iterations', type=int, default=2000, help='most MCTS iterations for the AI moves')
+    parser.add_argument('--think', type=float, default=SEARCH_TIME, help='most seconds the AI thinks about a move')
+    parser.add_argument('--duration', type=float, help='seconds to run for (default: until every source ends)')
+    args = parser.parse_args()
+
+    #OpenCV's own threads would fight with the pool for the CPU
+    cv2.setNumThreads(1)
+
+    service = VisionService(args.workers, args.search_workers)
+
+    for spec in args.source:
+        name, game = spec.rsplit(':', 1)
+        capture = cv2.VideoCapture(int(name) if name.isdigit() else name)
+        service.add_source(Source(name, capture, game, args.fps, {'iterations': args.iterations, 'time_limit': args.think}))
+
+    try:
+        service.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+
+    for source in service.sources:
+        source.capture.release()
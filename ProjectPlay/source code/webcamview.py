@@ -0,0 +1,98 @@
+##########################################################################################################################
+# Josh Doyle (ID: 20417714)                                                                                              #
+#                                                                                                                        #
+# Webcam view code:                                                                                                      #
+# This code shows the webcam feed inside the Tk window (on a canvas) instead of in a separate OpenCV window.             #
+# Instead of a busy loop it uses Tk's after() scheduling, so it only grabs a new frame at the target frame rate and      #
+# lets Tk sleep in between. This frees up the CPU for the MCTS search. When the window is minimised or the webcam        #
+# stops giving frames it drops down to a much lower idle frame rate.                                                     #
+#                                                                                                                        #
+##########################################################################################################################
+
+import time
+import tkinter as tk
+import cv2
+
+#target frame rate of the webcam preview (frames per second)
+FRAME_RATE = 20
+
+#frame rate used when there is nothing to show (window minimised or no frame from the webcam)
+IDLE_FRAME_RATE = 2
+
+class WebcamView:
+    def __init__(self, root, capture, width=320, height=240, frame_rate=FRAME_RATE):
+        self.root = root
+        self.capture = capture
+        self.width = width
+        self.height = height
+
+        #time between frames in milliseconds
+        self.frame_interval = 1000 / frame_rate
+        self.idle_interval = 1000 / IDLE_FRAME_RATE
+
+        #canvas that the webcam frames are drawn on
+        self.canvas = tk.Canvas(root, width=width, height=height, bg='black', highlightthickness=0)
+        self.photo = tk.PhotoImage(width=width, height=height)
+        self.canvas.create_image(0, 0, anchor='nw', image=self.photo)
+
+        #last frame read from the webcam (full size, used for the image processing)
+        self.frame = None
+
+        #a still image (e.g. the filtered image) is shown until this time instead of the live feed
+        self.still_until = 0
+
+        #id of the next scheduled frame so it can be cancelled
+        self.after_id = None
+
+    def place(self, **kwargs):
+        self.canvas.place(**kwargs)
+
+    def start(self):
+        if self.after_id is None:
+            self.tick()
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def tick(self):
+        start = time.perf_counter()
+        interval = self.frame_interval
+
+        #no point grabbing frames if no one can see them
+        if self.root.state() == 'iconic':
+            interval = self.idle_interval
+
+        #shows the live feed unless a still image is being shown
+        elif time.monotonic() >= self.still_until:
+            ret, frame = self.capture.read()
+
+            if ret:
+                self.frame = frame
+                self.draw(frame)
+            else:
+                interval = self.idle_interval
+
+        #waits for whatever is left of the frame time (Tk sleeps until then)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.after_id = self.root.after(max(1, int(interval - elapsed)), self.tick)
+
+    def read(self):
+        #gets a fresh frame for the image processing (falls back to the last frame shown)
+        ret, frame = self.capture.read()
+        if ret:
+            self.frame = frame
+        return self.frame
+
+    def show_still(self, image, seconds=2):
+        #shows an image (e.g. the filtered image for troubleshooting) in place of the live feed for a few seconds
+        self.draw(image)
+        self.still_until = time.monotonic() + seconds
+
+    def draw(self, image):
+        #scales the frame down to the canvas size and hands it to Tk as a PPM image (Tk can read these without PIL)
+        image = cv2.resize(image, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode('.ppm', image)
+        if ok:
+            self.photo.configure(data=data.tobytes())